@@ -4,7 +4,6 @@ const ENHANCED_API_BASE = 'http://localhost:8000/api'; // For new features
 
 // Global state
 let currentUser = null;
-let availableSymptoms = [];
 let selectedSymptoms = [];
 let currentPatientId = null;
 
@@ -243,14 +242,32 @@ function displayRecentConsultations(consultations) {
 }
 
 // Patient Management Functions
-async function loadPatients() {
+// /api/patients is paged; these track the listing currently shown
+let patientsQuery = '';
+let patientsCursor = null;
+let patientsLoaded = [];
+let patientsRequest = 0;
+
+async function loadPatients(query = '', append = false) {
+    const requestNumber = ++patientsRequest;
     try {
-        showLoading(true);
+        if (!append) showLoading(true);
+        
+        const params = new URLSearchParams();
+        if (query) params.set('q', query);
+        if (append && patientsCursor) params.set('cursor', patientsCursor);
+        const queryString = params.toString();
         
-        const response = await enhancedApiCall('/patients');
+        const response = await enhancedApiCall('/patients' + (queryString ? `?${queryString}` : ''));
+        
+        // A newer search has started since this one; drop the stale page
+        if (requestNumber !== patientsRequest) return;
         
         if (response.success) {
-            displayPatients(response.patients);
+            patientsQuery = query;
+            patientsCursor = response.next_cursor;
+            patientsLoaded = append ? patientsLoaded.concat(response.patients) : response.patients;
+            displayPatients(patientsLoaded, Boolean(response.has_more));
         } else {
             showMessage('Failed to load patients', 'error');
         }
@@ -259,11 +276,15 @@ async function loadPatients() {
         console.error('Failed to load patients:', error);
         showMessage('Failed to load patients: ' + error.message, 'error');
     } finally {
-        showLoading(false);
+        if (!append) showLoading(false);
     }
 }
 
-function displayPatients(patients) {
+function loadMorePatients() {
+    loadPatients(patientsQuery, true);
+}
+
+function displayPatients(patients, hasMore = false) {
     const patientsList = document.getElementById('patientsList');
     if (!patientsList) return;
     
@@ -293,7 +314,11 @@ function displayPatients(patients) {
                 </button>
             </div>
         </div>
-    `).join('');
+    `).join('') + (hasMore ? `
+        <div class="load-more">
+            <button onclick="loadMorePatients()" class="action-btn">Load more</button>
+        </div>
+    ` : '');
 }
 
 async function viewPatientSummary(patientId) {
@@ -509,20 +534,25 @@ async function setupPatientForm() {
     });
 }
 
-async function setupSymptomInput() {
+// Symptom suggestions come from /api/symptoms/suggest; mode=auto falls back to typo matching
+const SUGGEST_LIMIT = 10;
+const SUGGEST_DEBOUNCE_MS = 150;
+let suggestTimer = null;
+let suggestRequest = 0;
+
+function setupSymptomInput() {
     const searchInput = document.getElementById('symptomSearch');
     const suggestionsDiv = document.getElementById('symptomSuggestions');
     
     if (!searchInput || !suggestionsDiv) return;
     
-    // Load available symptoms
-    await loadAvailableSymptoms();
-    
     searchInput.addEventListener('input', (e) => {
         const query = e.target.value.trim();
+        clearTimeout(suggestTimer);
         if (query.length > 0) {
-            displaySymptomSuggestions(query);
+            suggestTimer = setTimeout(() => displaySymptomSuggestions(query), SUGGEST_DEBOUNCE_MS);
         } else {
+            suggestRequest++;  // ignore any request still in flight
             suggestionsDiv.style.display = 'none';
         }
     });
@@ -535,27 +565,27 @@ async function setupSymptomInput() {
     });
 }
 
-async function loadAvailableSymptoms() {
+async function displaySymptomSuggestions(query) {
+    const suggestionsDiv = document.getElementById('symptomSuggestions');
+    if (!suggestionsDiv) return;
+    
+    const requestNumber = ++suggestRequest;
+    let suggestions = [];
     try {
-        const response = await apiCall('/symptoms');
+        const params = new URLSearchParams({ q: query, mode: 'auto', limit: SUGGEST_LIMIT });
+        const response = await apiCall(`/symptoms/suggest?${params}`);
         if (response.success) {
-            availableSymptoms = response.symptoms;
+            suggestions = response.suggestions;
         }
     } catch (error) {
-        console.error('Failed to load symptoms:', error);
+        console.error('Failed to load symptom suggestions:', error);
     }
-}
-
-function displaySymptomSuggestions(query) {
-    const suggestionsDiv = document.getElementById('symptomSuggestions');
-    if (!suggestionsDiv) return;
     
-    const filteredSymptoms = availableSymptoms.filter(symptom => 
-        symptom.toLowerCase().includes(query.toLowerCase())
-    );
+    // A newer keystroke has already asked for its own suggestions
+    if (requestNumber !== suggestRequest) return;
     
-    if (filteredSymptoms.length > 0) {
-        suggestionsDiv.innerHTML = filteredSymptoms.map(symptom => 
+    if (suggestions.length > 0) {
+        suggestionsDiv.innerHTML = suggestions.map(symptom => 
             `<div class="suggestion-item" onclick="addSymptom('${symptom}')">${symptom}</div>`
         ).join('');
         suggestionsDiv.style.display = 'block';
@@ -770,21 +800,8 @@ function setupPatientSearch() {
 }
 
 async function filterPatients(query) {
-    try {
-        const response = await enhancedApiCall('/patients');
-        
-        if (response.success) {
-            const filteredPatients = response.patients.filter(patient => 
-                patient.name.toLowerCase().includes(query.toLowerCase()) ||
-                patient.registration_id.toLowerCase().includes(query.toLowerCase())
-            );
-            
-            displayPatients(filteredPatients);
-        }
-        
-    } catch (error) {
-        console.error('Search failed:', error);
-    }
+    // Prefix match on name or ID, searched server-side so patients beyond the first page are found too
+    await loadPatients(query);
 }
 
 async function checkAuthStatus() {
@@ -0,0 +1,92 @@
+import argparse
+import sys
+
+from enhanced_api import get_db_connection
+
+def load_doctor_names(cursor):
+    """Staff names to match against doctor_notes, longest first so the most specific name wins"""
+    cursor.execute("""
+        SELECT user_id, full_name FROM user_accounts
+        WHERE role IN ('doctor', 'nurse', 'admin') AND full_name IS NOT NULL AND full_name <> ''
+    """)
+    return sorted(cursor.fetchall(), key=lambda row: (-len(row[1]), row[0]))
+
+def match_doctor(notes, doctors):
+    """Return the user_id whose full name appears in the notes, or None"""
+    if not notes:
+        return None
+    for user_id, full_name in doctors:
+        if full_name in notes:
+            return user_id
+    return None
+
+def backfill(conn, batch_size, dry_run=False):
+    """Fill consultations.doctor_id for rows written before the column existed.
+
+    Rows are walked in consultation_id order, one batch per transaction.  The
+    author of the consultation's treatment plan is preferred; otherwise the
+    staff name embedded in doctor_notes is used (what the old LIKE join did).
+    """
+    cursor = conn.cursor()
+    doctors = load_doctor_names(cursor)
+
+    stats = {'scanned': 0, 'updated': 0, 'unmatched': 0, 'batches': 0}
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT c.consultation_id, c.doctor_notes,
+                   (SELECT MIN(tp.created_by) FROM treatment_plans tp
+                    WHERE tp.consultation_id = c.consultation_id) AS plan_author
+            FROM consultations c
+            WHERE c.doctor_id IS NULL AND c.consultation_id > %s
+            ORDER BY c.consultation_id
+            LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for consultation_id, notes, plan_author in rows:
+            doctor_id = plan_author or match_doctor(notes, doctors)
+            if doctor_id:
+                updates.append((doctor_id, consultation_id))
+            else:
+                stats['unmatched'] += 1
+
+        if updates and not dry_run:
+            cursor.executemany("UPDATE consultations SET doctor_id = %s WHERE consultation_id = %s", updates)
+            conn.commit()
+
+        last_id = rows[-1][0]
+        stats['scanned'] += len(rows)
+        stats['updated'] += len(updates)
+        stats['batches'] += 1
+        print(f"[BACKFILL] batch {stats['batches']}: up to consultation {last_id}, "
+              f"{stats['updated']} matched, {stats['unmatched']} unmatched")
+
+    cursor.close()
+    return stats
+
+def main():
+    """Backfill consultations.doctor_id from treatment plans and doctor notes"""
+    parser = argparse.ArgumentParser(description='Backfill consultations.doctor_id for existing rows')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='report matches without writing them')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        return 1
+
+    stats = backfill(conn, args.batch_size, dry_run=args.dry_run)
+    conn.close()
+
+    action = 'would be updated' if args.dry_run else 'updated'
+    print(f"[DONE] {stats['scanned']} consultations scanned, {stats['updated']} {action}, "
+          f"{stats['unmatched']} left without a doctor")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
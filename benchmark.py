@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from setup_database import setup_database
+
+BENCH_DATABASE = os.environ.get('BENCH_DB_NAME', 'patient_bench')
+DEFAULT_SIZES = '10,1000,10000'
+DEFAULT_PATIENTS = '1000,10000'
+PATHS = ('diagnose', 'diagnose_cached', 'suggest', 'register')
+
+# Synthetic symptom vocabulary on top of the real symptom names
+EXTRA_SYMPTOMS = 300
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(durations, elapsed, errors):
+    durations = sorted(durations)
+    return {
+        'ops': len(durations),
+        'errors': errors,
+        'ops_per_sec': round(len(durations) / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 3)
+    }
+
+def symptom_vocabulary(api):
+    return list(api.SYMPTOM_COLUMNS) + [f'symptom_{number:03d}' for number in range(EXTRA_SYMPTOMS)]
+
+def seed_catalog(api, conn, disease_count, rng):
+    """Replace the bench catalog with disease_count generated diseases"""
+    vocabulary = symptom_vocabulary(api)
+    cursor = conn.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in ('precautions', 'medicines', 'disease_symptom', 'disease'):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    diseases = [(f'Disease {number}', f'Generated disease {number}') for number in range(1, disease_count + 1)]
+    cursor.executemany("INSERT INTO disease (disease_name, description) VALUES (%s, %s)", diseases)
+    links, medicines, precautions = [], [], []
+    for disease_id in range(1, disease_count + 1):
+        for symptom in rng.sample(vocabulary, rng.randint(3, 8)):
+            links.append((disease_id, symptom))
+        medicines.extend((f'Medicine {disease_id}-{n}', '1 tablet twice daily', disease_id) for n in range(2))
+        precautions.extend((f'Precaution {disease_id}-{n}', disease_id) for n in range(2))
+    cursor.executemany("INSERT INTO disease_symptom (disease_id, symptom_name) VALUES (%s, %s)", links)
+    cursor.executemany("INSERT INTO medicines (medicine_name, dosage, disease_id) VALUES (%s, %s, %s)", medicines)
+    cursor.executemany("INSERT INTO precautions (precaution_text, disease_id) VALUES (%s, %s)", precautions)
+    conn.commit()
+
+    # Load the new catalog now rather than inside the first timed request
+    counts = api.refresh_catalog(cursor)
+    cursor.close()
+    return counts
+
+def seed_patients(api, conn, patient_count, rng):
+    """Top the bench database up to patient_count patients"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM patient_table")
+    existing = cursor.fetchone()[0]
+    cursor.close()
+    missing = max(0, patient_count - existing)
+    rows = ((line, {'name': f'Bench Patient {line}', 'age': rng.randint(1, 99),
+                    'gender': rng.choice(['Male', 'Female']), 'contact': f'555{line:07d}'}, None)
+            for line in range(existing + 1, existing + missing + 1))
+    if missing:
+        api.import_patients(conn, rows)
+    return existing + missing
+
+def parse_counts(value):
+    """Ascending list of the integers in a comma-separated option"""
+    return sorted({int(count) for count in value.split(',') if count.strip()})
+
+def time_operations(operation, iterations, warmup):
+    """Run operation() warmup + iterations times; returns summarize() of the timed runs"""
+    for _ in range(warmup):
+        operation()
+    durations = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        ok = operation()
+        durations.append(time.perf_counter() - start)
+        if not ok:
+            errors += 1
+    return summarize(durations, time.perf_counter() - started, errors)
+
+def run_paths(api, client, paths, iterations, warmup, rng):
+    vocabulary = symptom_vocabulary(api)
+    fixed_symptoms = rng.sample(vocabulary, 4)
+
+    def diagnose():
+        response = client.post('/api/diagnose', json={'symptoms': rng.sample(vocabulary, rng.randint(2, 6))})
+        return response.status_code == 200
+
+    def diagnose_cached():
+        response = client.post('/api/diagnose', json={'symptoms': fixed_symptoms})
+        return response.status_code == 200
+
+    def suggest():
+        symptom = rng.choice(vocabulary)
+        query = symptom[:rng.randint(2, max(2, len(symptom)))]
+        if rng.random() < 0.25 and len(query) > 3:
+            position = rng.randrange(len(query))
+            query = query[:position] + query[position + 1:]  # typo: dropped character
+        response = client.get('/api/symptoms/suggest', query_string={'q': query, 'mode': 'auto'})
+        return response.status_code == 200
+
+    def register():
+        response = client.post('/api/patient/register', json={
+            'name': 'Bench Register', 'age': rng.randint(1, 99), 'gender': 'Female', 'contact': '5550000000'
+        })
+        return response.status_code == 200
+
+    operations = {'diagnose': diagnose, 'diagnose_cached': diagnose_cached, 'suggest': suggest, 'register': register}
+    return {path: time_operations(operations[path], iterations, warmup) for path in paths}
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    """Seed the bench database at each patient count and catalog size and time every hot path"""
+    # enhanced_api reads its configuration at import time, so point it at the bench database first
+    os.environ['DB_NAME'] = args.database
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('CATALOG_CHECK_INTERVAL', '0')  # no CHECKSUM TABLE mid-run
+
+    if not args.skip_setup and not setup_database(args.database):
+        print("[ERROR] Bench database setup failed")
+        return None
+    import enhanced_api as api
+
+    rng = random.Random(args.seed)
+    client = api.app.test_client()
+    conn = api.get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        return None
+
+    # The patient table is only ever topped up, so walk patient counts in
+    # ascending order and re-seed the catalog at each size within each count
+    results = {}
+    for patient_count in parse_counts(args.patients):
+        patients = seed_patients(api, conn, patient_count, rng)
+        for size in parse_counts(args.sizes):
+            counts = seed_catalog(api, conn, size, rng)
+            print(f"[BENCH] catalog: {counts['diseases']} diseases, {counts['symptoms']} symptoms, {patients} patients")
+            for path, summary in run_paths(api, client, args.paths, args.iterations, args.warmup, rng).items():
+                key = f'{path}@{size}/{patient_count}'
+                summary['patients'] = patients
+                results[key] = summary
+                print(f"[BENCH] {key:<32} {summary['ops_per_sec']:>10.1f} ops/s  p50 {summary['p50_ms']:.3f} ms  "
+                      f"p95 {summary['p95_ms']:.3f} ms  p99 {summary['p99_ms']:.3f} ms  errors {summary['errors']}")
+    conn.close()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': api.np is not None,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+def compare(current, baseline, tolerance):
+    """Regressions of current against baseline: throughput down or p95 up by more than tolerance"""
+    regressions = []
+    for key, result in sorted(current['results'].items()):
+        base = baseline['results'].get(key)
+        if not base:
+            print(f"[NEW]  {key}")
+            continue
+        throughput = (result['ops_per_sec'] / base['ops_per_sec'] - 1) if base['ops_per_sec'] else 0.0
+        p95 = (result['p95_ms'] / base['p95_ms'] - 1) if base['p95_ms'] else 0.0
+        regressed = throughput < -tolerance or p95 > tolerance
+        status = 'FAIL' if regressed else 'OK'
+        print(f"[{status}] {key:<32} ops/s {throughput:+.1%}  p95 {p95:+.1%}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+def main():
+    """Benchmark the diagnose, suggest and register hot paths"""
+    parser = argparse.ArgumentParser(description='Benchmark the API hot paths against a seeded bench database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='seed the bench database and time the hot paths')
+    run_parser.add_argument('--database', default=BENCH_DATABASE, help='scratch database; its catalog tables are truncated and re-seeded')
+    run_parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated disease counts')
+    run_parser.add_argument('--patients', default=DEFAULT_PATIENTS, help='comma-separated patient counts')
+    run_parser.add_argument('--paths', type=lambda value: value.split(','), default=list(PATHS),
+                            help=f"comma-separated subset of {','.join(PATHS)}")
+    run_parser.add_argument('--iterations', type=int, default=500)
+    run_parser.add_argument('--warmup', type=int, default=50)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--skip-setup', action='store_true', help='bench database already exists')
+    run_parser.add_argument('--save', help='write results JSON here (e.g. a new baseline)')
+    run_parser.add_argument('--baseline', help='compare against this results JSON')
+    run_parser.add_argument('--tolerance', type=float, default=0.10)
+
+    compare_parser = commands.add_parser('compare', help='compare two saved results files')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.current) as file:
+            current = json.load(file)
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    else:
+        unknown = [path for path in args.paths if path not in PATHS]
+        if unknown:
+            parser.error(f"unknown paths: {', '.join(unknown)}")
+        current = run(args)
+        if current is None:
+            return 1
+        if args.save:
+            with open(args.save, 'w') as file:
+                json.dump(current, file, indent=2)
+            print(f"[DONE] Results saved to {args.save}")
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"[FAIL] {len(regressions)} regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"[OK] No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,34 @@
-from flask import Flask, request, jsonify, session, send_from_directory
+from flask import Flask, request, jsonify, session, send_from_directory, g, has_app_context, Response, stream_with_context
 from flask_cors import CORS
 import mysql.connector
 import json
+import re
+import base64
+import csv
+import io
+import string
 from datetime import datetime, date
+from decimal import Decimal
 import hashlib
-from functools import wraps
+import logging
+import logging.handlers
+import queue
+import sys
+import atexit
+import uuid
+from functools import wraps, lru_cache
 import os
+import threading
+import time
+import heapq
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the inverted index covers small catalogs
+    np = None
 
 app = Flask(__name__)
 app.secret_key = 'medicare_secret_key_2025'
@@ -19,15 +42,1793 @@ DB_CONFIG = {
     'database': os.environ.get('DB_NAME', 'patient')
 }
 
+# Connection pool: size, checkout timeout (seconds) and maximum connection age (seconds)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+DB_POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', '3600'))
+
+# Independent read queries run concurrently on pooled connections (threads, seconds per request)
+QUERY_FANOUT_WORKERS = int(os.environ.get('QUERY_FANOUT_WORKERS', '8'))
+QUERY_FANOUT_TIMEOUT = float(os.environ.get('QUERY_FANOUT_TIMEOUT', '5'))
+
+# How long require_auth trusts a cached role before re-reading user_accounts (seconds)
+ROLE_CACHE_TTL = float(os.environ.get('ROLE_CACHE_TTL', '60'))
+
+# /api/patients page size (default and hard cap)
+PATIENTS_PAGE_SIZE = int(os.environ.get('PATIENTS_PAGE_SIZE', '50'))
+PATIENTS_PAGE_MAX = 500
+
+# Rows pulled from the server-side cursor per chunk of an NDJSON export
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '1000'))
+
+# Exportable columns: name -> SQL expression
+PATIENT_EXPORT_COLUMNS = OrderedDict([
+    ('registration_id', 'p.registration_id'),
+    ('name', 'p.name'),
+    ('gender', 'p.gender'),
+    ('age', 'p.age'),
+    ('contact', 'p.contact'),
+    ('consultation_count', 'COALESCE(v.consultation_count, 0)'),
+    ('last_visit', 'v.last_visit')
+])
+CONSULTATION_EXPORT_COLUMNS = OrderedDict([
+    ('consultation_id', 'c.consultation_id'),
+    ('patient_id', 'c.patient_id'),
+    ('consultation_date', 'c.consultation_date'),
+    ('symptoms_analyzed', 'c.symptoms_analyzed'),
+    ('diagnosis_results', 'c.diagnosis_results'),
+    ('confidence_score', 'c.confidence_score'),
+    ('doctor_notes', 'c.doctor_notes'),
+    ('doctor_id', 'c.doctor_id'),
+    ('follow_up_date', 'c.follow_up_date'),
+    ('status', 'c.status')
+])
+EXPORT_JSON_COLUMNS = {'symptoms_analyzed', 'diagnosis_results'}
+
+# Bulk patient import: rows per multi-row INSERT and how many row errors are reported
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_ERRORS = 1000
+
+# Registration IDs reserved from id_sequences per round trip, per worker process
+REGISTRATION_ID_BLOCK = int(os.environ.get('REGISTRATION_ID_BLOCK', '100'))
+
+# Diagnosis scoring engine: 'index', 'matrix' or 'auto' (matrix once the catalog is large)
+DIAGNOSIS_ENGINE = os.environ.get('DIAGNOSIS_ENGINE', 'auto')
+MATRIX_MIN_DISEASES = int(os.environ.get('MATRIX_MIN_DISEASES', '500'))
+
+# Maximum number of patients accepted by one /api/diagnose/batch call
+DIAGNOSE_BATCH_LIMIT = int(os.environ.get('DIAGNOSE_BATCH_LIMIT', '200'))
+
+# Diagnosis result cache and background catalog change detection (interval <= 0 disables the check)
+DIAGNOSIS_CACHE_SIZE = int(os.environ.get('DIAGNOSIS_CACHE_SIZE', '1024'))
+DIAGNOSIS_CACHE_TTL = float(os.environ.get('DIAGNOSIS_CACHE_TTL', '300'))
+CATALOG_CHECK_INTERVAL = float(os.environ.get('CATALOG_CHECK_INTERVAL', '30'))
+
+# Symptom observations returned by the patient summary (default and hard cap)
+SYMPTOM_HISTORY_LIMIT = int(os.environ.get('SYMPTOM_HISTORY_LIMIT', '20'))
+SYMPTOM_HISTORY_MAX = 200
+
+# /api/symptoms/suggest result size (default and hard cap)
+SUGGEST_DEFAULT_LIMIT = int(os.environ.get('SUGGEST_DEFAULT_LIMIT', '10'))
+SUGGEST_MAX_LIMIT = 100
+
+# Typo-tolerant suggestions: maximum edit distance and per-query time budget
+FUZZY_MAX_DISTANCE = int(os.environ.get('FUZZY_MAX_DISTANCE', '2'))
+FUZZY_BUDGET_MS = float(os.environ.get('FUZZY_BUDGET_MS', '5'))
+
+# Health probes: refresh period of the cached /api/health/stats counts and readiness checkout timeout (seconds)
+HEALTH_STATS_INTERVAL = float(os.environ.get('HEALTH_STATS_INTERVAL', '30'))
+HEALTH_READY_TIMEOUT = float(os.environ.get('HEALTH_READY_TIMEOUT', '1'))
+
+# Prometheus metrics; with METRICS_DIR set each worker publishes a snapshot there
+# every METRICS_FLUSH_INTERVAL seconds and /api/metrics reports the combined view
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Logging: minimum level, output format ('json' or 'text')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+
+# SQL profiler: 'off', 'header' (requests sending X-SQL-Profile: 1) or 'all'; statements kept per request
+SQL_PROFILE = os.environ.get('SQL_PROFILE', 'off').lower()
+SQL_PROFILE_MAX_STATEMENTS = int(os.environ.get('SQL_PROFILE_MAX_STATEMENTS', '500'))
+# Statements slower than this (ms, 0 = off) are logged with their EXPLAIN plan, at most once per interval (s)
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '0'))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', '60'))
+
+# Boolean symptom columns of the legacy symptoms_table (see Patient_entry.sql); also the
+# column order of the "latest symptoms" projection returned to existing callers
+SYMPTOM_COLUMNS = (
+    # General
+    'fever', 'high_fever', 'mild_fever', 'chills', 'fatigue', 'weakness',
+    'body_ache', 'body_pain', 'night_sweats', 'sweating', 'weight_loss',
+    # Respiratory
+    'dry_cough', 'wet_cough', 'persistent_cough', 'blood_in_cough',
+    'chest_pain', 'chest_tightness', 'breathing_difficulty', 'fast_breathing',
+    'sore_throat', 'runny_nose', 'sneezing', 'nasal_congestion',
+    # Gastrointestinal
+    'nausea', 'vomiting', 'diarrhea', 'constipation', 'stomach_pain', 'stomach_cramps',
+    'loss_of_appetite', 'appetite_loss', 'dehydration',
+    # Neurological
+    'dizziness', 'headache', 'confusion',
+    # Skin
+    'rash', 'skin_rash', 'skin_blisters', 'red_eyes', 'watery_eyes', 'itchy_eyes', 'itchy_throat',
+    # Other
+    'eye_pain', 'ear_pain', 'bleeding_gums', 'low_platelet', 'difficulty_swallowing',
+    'swollen_tonsils', 'white_spots_mouth'
+)
+
+# Appends one row to the patient's symptom history; symptoms_table is no longer rewritten.
+# Selecting through patient_table makes an unknown patient a 0-row insert
+# instead of a foreign-key error, without a separate existence check.
+SYMPTOM_OBSERVATION_SQL = """
+    INSERT INTO symptom_observations (registration_id, symptoms)
+    SELECT registration_id, %s FROM patient_table WHERE registration_id = %s
+"""
+
+def symptom_flags(symptoms):
+    """0/1 value for every column in SYMPTOM_COLUMNS; unknown symptom names are ignored"""
+    submitted = set(symptoms)
+    return tuple(1 if column in submitted else 0 for column in SYMPTOM_COLUMNS)
+
+# Logging
+# Request context for worker threads that act on behalf of a request (query fan-out)
+worker_request_context = threading.local()
+
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the current request ID on the thread that logged it"""
+
+    def filter(self, record):
+        if has_app_context():
+            record.request_id = g.get('request_id')
+        else:
+            record.request_id = getattr(worker_request_context, 'request_id', None)
+        return True
+
+# LogRecord attributes that are not user-supplied extra fields
+STANDARD_LOG_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id'}
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with extra={...} are included"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', None),
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_LOG_FIELDS:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+def configure_logging():
+    """Send records through a queue so request threads never block on output"""
+    if LOG_FORMAT == 'text':
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+    else:
+        formatter = JsonLogFormatter()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    atexit.register(listener.stop)  # drain queued records on shutdown
+
+    app_logger = logging.getLogger('medicare')
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(handler)
+    app_logger.propagate = False
+    return app_logger
+
+logger = configure_logging()
+
+# Metrics
+class Metrics:
+    """Thread-safe in-process counters and histograms, exported in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self.descriptions = {}
+
+    def describe(self, name, kind, text):
+        self.descriptions[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            # Per-bucket counts; made cumulative when rendered
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram[1][index] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def collector(self, func):
+        """Register a function returning (kind, name, labels, value) samples read at scrape time"""
+        self._collectors.append(func)
+        return func
+
+    def snapshot(self):
+        """JSON-serializable copy of this process's samples"""
+        with self._lock:
+            counters = [[name, labels, value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, labels, list(h[0]), list(h[1]), h[2], h[3]]
+                          for (name, labels), h in self._histograms.items()]
+        gauges = []
+        for collect in self._collectors:
+            for kind, name, labels, value in collect():
+                (counters if kind == 'counter' else gauges).append([name, labels, value])
+        return {'pid': os.getpid(), 'time': time.time(),
+                'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+metrics = Metrics()
+metrics.describe('http_request_duration_seconds', 'histogram', 'Request latency by route, method and status')
+metrics.describe('db_queries_per_request', 'histogram', 'SQL statements issued per request')
+metrics.describe('db_query_time_per_request_seconds', 'histogram', 'Time spent in SQL per request')
+metrics.describe('db_query_duration_seconds', 'histogram', 'SQL statement latency by statement type')
+metrics.describe('db_connect_seconds', 'histogram', 'Time to open a new MySQL connection')
+metrics.describe('db_pool_wait_seconds', 'histogram', 'Time spent waiting for a pooled connection')
+
+def metric_key(labels):
+    """Hashable form of a label list read back from JSON"""
+    return tuple(tuple(pair) for pair in labels)
+
+def merge_metric_snapshots(snapshots):
+    """Sum counters, gauges and histograms across worker snapshots"""
+    counters = {}
+    gauges = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, metric_key(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot['gauges']:
+            key = (name, metric_key(labels))
+            gauges[key] = gauges.get(key, 0) + value
+        for name, labels, buckets, counts, total, count in snapshot['histograms']:
+            key = (name, metric_key(labels), tuple(buckets))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+
+    # Ratios are derived after summing so they are correct across workers
+    for (name, labels), hits in list(counters.items()):
+        if name.endswith('_hits_total'):
+            prefix = name[:-len('_hits_total')]
+            lookups = hits + counters.get((prefix + '_misses_total', labels), 0)
+            gauges[(prefix + '_hit_ratio', labels)] = (hits / lookups) if lookups else 0.0
+    for (name, labels), size in list(gauges.items()):
+        if name == 'db_pool_size':
+            in_use = gauges.get(('db_pool_in_use', labels), 0)
+            gauges[('db_pool_saturation', labels)] = (in_use / size) if size else 0.0
+    return counters, gauges, histograms
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+def format_number(value):
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_prometheus(counters, gauges, histograms):
+    """Prometheus text exposition format (version 0.0.4)"""
+    families = OrderedDict()
+    for (name, labels), value in sorted(counters.items()):
+        families.setdefault((name, 'counter'), []).append(f'{name}{format_labels(labels)} {format_number(value)}')
+    for (name, labels), value in sorted(gauges.items()):
+        families.setdefault((name, 'gauge'), []).append(f'{name}{format_labels(labels)} {format_number(value)}')
+    for (name, labels, buckets), (counts, total, count) in sorted(histograms.items()):
+        lines = families.setdefault((name, 'histogram'), [])
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{format_labels(labels, [("le", format_number(float(bound)))])} {cumulative}')
+        lines.append(f'{name}_bucket{format_labels(labels, [("le", "+Inf")])} {count}')
+        lines.append(f'{name}_sum{format_labels(labels)} {format_number(total)}')
+        lines.append(f'{name}_count{format_labels(labels)} {count}')
+
+    output = []
+    for (name, kind), lines in families.items():
+        _, text = metrics.descriptions.get(name, (kind, name.replace('_', ' ')))
+        output.append(f'# HELP {name} {text}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(lines)
+    return '\n'.join(output) + '\n'
+
+class MetricsPublisher:
+    """Writes this worker's snapshot to METRICS_DIR so any worker can serve the combined view"""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+    def publish(self):
+        snapshot = metrics.snapshot()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(temp_path, self.path)  # readers never see a half-written file
+        return snapshot
+
+    def collect(self):
+        """Fresh snapshot for this worker plus the latest published by the others"""
+        snapshots = [self.publish()]
+        # A worker that stopped publishing has exited; drop it from the view
+        stale_after = max(60.0, self.interval * 10)
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if not entry.startswith('metrics-') or not entry.endswith('.json') or path == self.path:
+                continue
+            try:
+                if time.time() - os.path.getmtime(path) > stale_after:
+                    continue
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue  # removed or replaced mid-read
+        return snapshots
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except OSError as err:
+                logger.warning("Metrics publish failed: %s", err)
+
+    def ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._thread = threading.Thread(target=self._run, name='metrics-publisher', daemon=True)
+                    self._thread.start()
+
+metrics_publisher = MetricsPublisher(METRICS_DIR, METRICS_FLUSH_INTERVAL) if METRICS_DIR else None
+
+SQL_STATEMENT_TYPES = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CHECKSUM', 'EXPLAIN'}
+
+query_stats_lock = threading.Lock()
+
+def current_query_stats():
+    """The SQL totals dict of the request this thread is working for, if any"""
+    stats = getattr(worker_request_context, 'stats', None)
+    if stats is None and has_app_context():
+        stats = g.get('db_query_stats')
+    return stats
+
+@lru_cache(maxsize=1024)
+def normalize_sql(operation):
+    """Statement shape with literals and placeholder lists folded, for grouping"""
+    sql = ' '.join(operation.split())
+    sql = re.sub(r"'(?:[^'\\]|\\.|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?+)', sql)
+    sql = re.sub(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+', '(?+), ...', sql)
+    return sql
+
+slow_query_lock = threading.Lock()
+slow_query_explained = {}  # normalized statement -> time of its last EXPLAIN
+
+def explain_slow_query(operation, params, normalized, request_id):
+    """Log the plan of a slow statement using a spare pooled connection (skipped if none is free)"""
+    worker_request_context.request_id = request_id
+    try:
+        try:
+            conn = db_pool.borrow(timeout=0)
+        except (mysql.connector.Error, PoolTimeout):
+            return
+        try:
+            cursor = conn.cursor()
+            cursor.execute("EXPLAIN " + operation, params)
+            columns = [column[0] for column in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            cursor.close()
+        except mysql.connector.Error as err:
+            logger.warning("EXPLAIN failed for slow query: %s", err, extra={'sql': normalized})
+            return
+        finally:
+            conn.close()
+        logger.warning("Slow query plan", extra={'sql': normalized, 'plan': plan})
+    finally:
+        worker_request_context.request_id = None
+
+def log_slow_query(statement, normalized, operation, params, elapsed, rows):
+    logger.warning("Slow query", extra={'sql': normalized, 'duration_ms': round(elapsed * 1000, 2), 'rows': rows})
+    if statement not in ('SELECT', 'UPDATE', 'DELETE'):
+        return
+    now = time.monotonic()
+    with slow_query_lock:
+        last = slow_query_explained.get(normalized)
+        if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL:
+            return
+        if len(slow_query_explained) > 1000:
+            slow_query_explained.clear()
+        slow_query_explained[normalized] = now
+    # Off the request thread, on its own connection (the caller may still have unread rows)
+    request_id = g.get('request_id') if has_app_context() else getattr(worker_request_context, 'request_id', None)
+    query_executor.submit(explain_slow_query, operation, params, normalized, request_id)
+
+def record_query(operation, elapsed, cursor=None, params=None, many=False):
+    """Count one executed statement in the metrics, the current request's totals and its profile"""
+    words = operation.split(None, 1) if isinstance(operation, str) else []
+    statement = words[0].upper() if words else ''
+    metrics.observe('db_query_duration_seconds', elapsed,
+                    (('statement', statement if statement in SQL_STATEMENT_TYPES else 'OTHER'),))
+    stats = current_query_stats()
+    profile = stats.get('profile') if stats is not None else None
+    slow = SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS and statement != 'EXPLAIN'
+    if profile is not None or slow:
+        normalized = normalize_sql(operation) if isinstance(operation, str) else repr(operation)
+        rows = getattr(cursor, 'rowcount', -1)
+    if stats is not None:
+        with query_stats_lock:
+            stats['count'] += 1
+            stats['time'] += elapsed
+            if profile is not None and len(profile) < SQL_PROFILE_MAX_STATEMENTS:
+                profile.append((normalized, elapsed, rows))
+    if slow:
+        log_slow_query(statement, normalized, operation, None if many else params, elapsed, rows)
+
+class TimedCursor:
+    """Cursor proxy that times execute()/executemany() calls"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - start, self._cursor, params)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - start, self._cursor, many=True)
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the checkout timeout"""
+
+class PooledConnection:
+    """Borrowed connection; close() hands it back to the pool instead of disconnecting"""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._raw.cursor(*args, **kwargs))
+
+    @property
+    def closed(self):
+        return self._raw is None
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw, self._created_at)
+
+class ConnectionPool:
+    """Bounded MySQL connection pool with checkout timeout and validation on borrow"""
+
+    def __init__(self, config, size, timeout, recycle):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, created_at), most recently returned last
+        self.in_use = 0
+        self.created = 0
+        self.recycled = 0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.connect_time_total = 0.0
+
+    def _connect(self):
+        start = time.perf_counter()
+        raw = mysql.connector.connect(**self.config)
+        elapsed = time.perf_counter() - start
+        metrics.observe('db_connect_seconds', elapsed)
+        with self._lock:
+            self.created += 1
+            self.connect_time_total += elapsed
+        return raw, time.monotonic()
+
+    def _discard(self, raw):
+        with self._lock:
+            self.recycled += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def borrow(self, timeout=None):
+        """Check out a live connection, waiting up to the checkout timeout for a free slot"""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f'No database connection available within {self.timeout}s')
+        waited = time.perf_counter() - start
+        metrics.observe('db_pool_wait_seconds', waited)
+
+        try:
+            raw = None
+            while raw is None:
+                with self._lock:
+                    raw, created_at = self._idle.pop() if self._idle else (None, None)
+                if raw is None:
+                    raw, created_at = self._connect()
+                    break
+                # Validate on borrow: too old or no longer answering pings means replace it
+                if time.monotonic() - created_at > self.recycle or not raw.is_connected():
+                    self._discard(raw)
+                    raw = None
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at):
+        """Return a connection; anything left uncommitted is rolled back first"""
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            reusable = raw.is_connected()
+        except Exception:
+            reusable = False
+
+        if reusable:
+            with self._lock:
+                self._idle.append((raw, created_at))
+        else:
+            self._discard(raw)
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'created': self.created,
+                'recycled': self.recycled,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_time_avg_ms': (self.wait_time_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                'wait_time_max_ms': self.wait_time_max * 1000,
+                'connect_time_avg_ms': (self.connect_time_total / self.created * 1000) if self.created else 0.0
+            }
+
+db_pool = ConnectionPool(DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_RECYCLE)
+
+@metrics.collector
+def pool_metrics():
+    stats = db_pool.stats()
+    return [
+        ('gauge', 'db_pool_size', (), stats['size']),
+        ('gauge', 'db_pool_in_use', (), stats['in_use']),
+        ('gauge', 'db_pool_idle', (), stats['idle']),
+        ('counter', 'db_pool_checkouts_total', (), stats['checkouts']),
+        ('counter', 'db_pool_timeouts_total', (), stats['timeouts']),
+        ('counter', 'db_pool_connections_created_total', (), stats['created']),
+        ('counter', 'db_pool_connections_recycled_total', (), stats['recycled'])
+    ]
+
 def get_db_connection():
-    """Get database connection"""
+    """Get a pooled database connection (close() returns it to the pool)"""
     try:
-        return mysql.connector.connect(**DB_CONFIG)
-    except mysql.connector.Error as err:
-        print(f"Database connection error: {err}")
+        conn = db_pool.borrow()
+    except (mysql.connector.Error, PoolTimeout) as err:
+        logger.error("Database connection error: %s", err)
         return None
+    # Handlers that return early without closing still give the connection back
+    if has_app_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+@app.teardown_appcontext
+def release_db_connections(exc):
+    """Return any connection a request left checked out"""
+    for conn in g.pop('db_connections', []):
+        conn.close()
+
+@app.before_request
+def assign_request_id():
+    """Reuse a well-formed X-Request-ID from the caller, otherwise mint one"""
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+
+@app.after_request
+def echo_request_id(response):
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.db_query_stats = {'count': 0, 'time': 0.0}
+    if SQL_PROFILE == 'all' or (SQL_PROFILE == 'header' and request.headers.get('X-SQL-Profile') == '1'):
+        g.db_query_stats['profile'] = []
+    if metrics_publisher:
+        metrics_publisher.ensure_started()
+
+@app.after_request
+def record_request_metrics(response):
+    """Request latency by route template (not raw path) and status, plus SQL issued"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        (('method', request.method), ('route', route), ('status', str(response.status_code))))
+        stats = g.db_query_stats
+        metrics.observe('db_queries_per_request', stats['count'], (('route', route),), QUERY_COUNT_BUCKETS)
+        metrics.observe('db_query_time_per_request_seconds', stats['time'], (('route', route),))
+    return response
+
+@app.after_request
+def attach_sql_profile(response):
+    """Summarize a profiled request in X-SQL-Profile and log its statements grouped by shape"""
+    stats = g.get('db_query_stats')
+    profile = stats.get('profile') if stats else None
+    if profile is None:
+        return response
+
+    with query_stats_lock:
+        entries = list(profile)
+    grouped = OrderedDict()
+    for normalized, elapsed, rows in entries:
+        group = grouped.setdefault(normalized, [0, 0.0, 0])
+        group[0] += 1
+        group[1] += elapsed
+        group[2] += max(rows, 0)
+
+    slowest = max((elapsed for _, elapsed, _ in entries), default=0.0)
+    most_repeated = max((group[0] for group in grouped.values()), default=0)
+    response.headers['X-SQL-Profile'] = (
+        f"queries={stats['count']}; distinct={len(grouped)}; total_ms={stats['time'] * 1000:.2f}; "
+        f"slowest_ms={slowest * 1000:.2f}; max_repeat={most_repeated}"
+    )
+
+    route = request.url_rule.rule if request.url_rule else request.path
+    logger.info("SQL profile", extra={
+        'method': request.method,
+        'route': route,
+        'summary': response.headers['X-SQL-Profile'],
+        'statements': [
+            {'sql': normalized, 'count': count, 'total_ms': round(elapsed * 1000, 2), 'rows': rows}
+            for normalized, (count, elapsed, rows) in sorted(grouped.items(), key=lambda item: -item[1][1])
+        ]
+    })
+    return response
+
+# Concurrent read fan-out
+query_executor = ThreadPoolExecutor(max_workers=QUERY_FANOUT_WORKERS, thread_name_prefix='query-fanout')
+
+def run_query_task(task, deadline, query_stats, request_id):
+    """Run one fan-out task on its own pooled connection, borrowed within the deadline"""
+    worker_request_context.stats = query_stats
+    worker_request_context.request_id = request_id
+    try:
+        conn = db_pool.borrow(timeout=max(0.0, deadline - time.monotonic()))
+        try:
+            cursor = conn.cursor()
+            try:
+                return task(cursor)
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+    finally:
+        worker_request_context.stats = None
+        worker_request_context.request_id = None
+
+def fan_out_queries(tasks, timeout=QUERY_FANOUT_TIMEOUT):
+    """Run independent read queries concurrently and collect whatever finishes in time.
+
+    tasks maps a name to a callable taking a cursor.  Returns (results,
+    errors): results holds the value of every task that completed, errors
+    maps the others to a message.  A task that overruns keeps its connection
+    until it finishes in the background; the caller is not held up by it.
+    """
+    deadline = time.monotonic() + timeout
+    query_stats = current_query_stats()
+    request_id = g.get('request_id') if has_app_context() else None
+    futures = {name: query_executor.submit(run_query_task, task, deadline, query_stats, request_id)
+               for name, task in tasks.items()}
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            errors[name] = f'Timed out after {timeout}s'
+        except (mysql.connector.Error, PoolTimeout) as err:
+            errors[name] = str(err)
+        except Exception as err:
+            # e.g. a malformed row; one bad section should not fail the whole response
+            logger.exception("Fan-out task %s failed", name)
+            errors[name] = str(err)
+    return results, errors
+
+# Diagnosis catalog caches
+class CatalogCache:
+    """Lazily built, atomically swapped in-process copy of catalog tables"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def load(self, cursor):
+        """Read the tables backing this cache and return a new snapshot"""
+        raise NotImplementedError
+
+    def build(self, cursor):
+        """(Re)load the snapshot from the database"""
+        snapshot = self.load(cursor)
+        # Swap in a complete snapshot so concurrent readers never see a partial one
+        self._snapshot = snapshot
+        return snapshot
+
+    def get(self, cursor):
+        """Return the current snapshot, building it on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self.build(cursor)
+        return snapshot
+
+    def peek(self):
+        """Return the current snapshot without building it (None if not loaded)"""
+        return self._snapshot
+
+class SymptomIndex(CatalogCache):
+    """In-process symptom -> disease inverted index compiled from disease_symptom"""
+
+    def load(self, cursor):
+        """Compile the index from the disease and disease_symptom tables"""
+        cursor.execute("""
+            SELECT d.disease_id, d.disease_name, d.description, ds.symptom_name
+            FROM disease d
+            JOIN disease_symptom ds ON d.disease_id = ds.disease_id
+        """)
+
+        diseases = {}
+        postings = {}
+        for disease_id, disease_name, description, symptom in cursor.fetchall():
+            if disease_id not in diseases:
+                diseases[disease_id] = {
+                    'id': disease_id,
+                    'name': disease_name,
+                    'description': description,
+                    'symptoms': [],
+                    'symptom_set': set(),
+                    'position': len(diseases)
+                }
+            disease = diseases[disease_id]
+            disease['symptoms'].append(symptom)
+            if symptom not in disease['symptom_set']:
+                disease['symptom_set'].add(symptom)
+                postings.setdefault(symptom, []).append(disease_id)
+
+        snapshot = {
+            'diseases': diseases,
+            'postings': postings,
+            'matrix': None,
+            'suggest': SuggestIndex({symptom: len(ids) for symptom, ids in postings.items() if symptom})
+        }
+        if use_matrix_engine(len(diseases)):
+            snapshot['matrix'] = build_symptom_matrix(diseases)
+        return snapshot
+
+def edit_distances(word, max_distance):
+    """All strings reachable from word by up to max_distance deletions, nearest first"""
+    levels = [{word}]
+    for _ in range(max_distance):
+        levels.append({variant[:i] + variant[i + 1:] for variant in levels[-1] for i in range(len(variant))})
+    return levels
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class SuggestIndex:
+    """Prefix, infix and typo-tolerant lookup over the symptom vocabulary"""
+
+    GRAM_SIZE = 3
+    # Deletes are precomputed for this many leading characters only (SymSpell style)
+    FUZZY_PREFIX = 7
+
+    def __init__(self, vocabulary, max_distance=FUZZY_MAX_DISTANCE):
+        # Sorted keys give trie-style prefix ranges with one binary search
+        entries = sorted((name.lower(), name) for name in vocabulary)
+        self.keys = [key for key, _ in entries]
+        self.names = [name for _, name in entries]
+        self.popularity = [vocabulary[name] for name in self.names]
+        self.max_distance = max_distance
+
+        # Precomputed deletes: any key within max_distance of a query shares a delete with it
+        self.deletes = {}
+        for position, key in enumerate(self.keys):
+            for level in edit_distances(key[:self.FUZZY_PREFIX], max_distance):
+                for variant in level:
+                    self.deletes.setdefault(variant, []).append(position)
+
+        # Postings for every substring up to GRAM_SIZE characters
+        self.grams = {}
+        for position, key in enumerate(self.keys):
+            for size in range(1, self.GRAM_SIZE + 1):
+                for start in range(len(key) - size + 1):
+                    self.grams.setdefault(key[start:start + size], set()).add(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix_matches(self, query):
+        """Positions of keys starting with query, in alphabetical order"""
+        position = bisect_left(self.keys, query)
+        while position < len(self.keys) and self.keys[position].startswith(query):
+            yield position
+            position += 1
+
+    def infix_matches(self, query):
+        """Positions of keys containing query anywhere"""
+        if len(query) <= self.GRAM_SIZE:
+            return self.grams.get(query, set())
+
+        postings = []
+        for start in range(len(query) - self.GRAM_SIZE + 1):
+            gram = self.grams.get(query[start:start + self.GRAM_SIZE])
+            if not gram:
+                return set()
+            postings.append(gram)
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        # Trigram hits are only candidates; confirm the full substring
+        return {position for position in candidates if query in self.keys[position]}
+
+    def suggest(self, query, limit):
+        """Prefix hits first, then other substring hits, each alphabetically"""
+        results = []
+        seen = set()
+        for position in self.prefix_matches(query):
+            if len(results) >= limit:
+                return results
+            results.append(self.names[position])
+            seen.add(position)
+        # Positions follow alphabetical order, so the smallest ones are the first names
+        for position in heapq.nsmallest(limit - len(results), self.infix_matches(query) - seen):
+            results.append(self.names[position])
+        return results
+
+    def fuzzy(self, query, limit, budget_ms=FUZZY_BUDGET_MS):
+        """Closest keys by edit distance, then popularity; stops when the budget runs out"""
+        deadline = time.perf_counter() + budget_ms / 1000
+        matches = []
+        seen = set()
+        truncated = False
+        # Candidates sharing a delete with fewer edits are checked first
+        for level in edit_distances(query[:self.FUZZY_PREFIX], self.max_distance):
+            for variant in level:
+                for position in self.deletes.get(variant, ()):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    if len(seen) % 32 == 0 and time.perf_counter() > deadline:
+                        truncated = True
+                        break
+                    distance = edit_distance(query, self.keys[position], self.max_distance)
+                    if distance <= self.max_distance:
+                        matches.append((distance, -self.popularity[position], self.keys[position], position))
+                if truncated:
+                    break
+            if truncated:
+                break
+
+        return [
+            {'symptom': self.names[position], 'distance': distance, 'popularity': -popularity}
+            for distance, popularity, _, position in heapq.nsmallest(limit, matches)
+        ], truncated
+
+def normalize_symptom_query(query):
+    """Lower-case a typed query and map spaces to the catalog's underscores"""
+    return '_'.join(query.strip().lower().split())
+
+class TreatmentCatalog(CatalogCache):
+    """Medicines and precautions keyed by disease_id, loaded in bulk"""
+
+    def load(self, cursor):
+        """Load every medicine and precaution with one query per table"""
+        medicines = {}
+        cursor.execute("SELECT disease_id, medicine_name, dosage FROM medicines ORDER BY medicine_id")
+        for disease_id, medicine_name, dosage in cursor.fetchall():
+            medicines.setdefault(disease_id, []).append({'name': medicine_name, 'dosage': dosage})
+
+        precautions = {}
+        cursor.execute("SELECT disease_id, precaution_text FROM precautions ORDER BY precaution_id")
+        for disease_id, precaution_text in cursor.fetchall():
+            precautions.setdefault(disease_id, []).append(precaution_text)
+
+        return {'medicines': medicines, 'precautions': precautions}
+
+class DiagnosisResultCache:
+    """Bounded LRU/TTL cache of ranked diagnosis results keyed by canonical symptom set"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, generation):
+        """Return cached results built from this catalog generation, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, generation, results):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0
+            }
+
+symptom_index = SymptomIndex()
+treatment_catalog = TreatmentCatalog()
+diagnosis_cache = DiagnosisResultCache(DIAGNOSIS_CACHE_SIZE, DIAGNOSIS_CACHE_TTL)
+
+@metrics.collector
+def diagnosis_cache_metrics():
+    stats = diagnosis_cache.stats()
+    return [
+        ('counter', 'diagnosis_cache_hits_total', (), stats['hits']),
+        ('counter', 'diagnosis_cache_misses_total', (), stats['misses']),
+        ('counter', 'diagnosis_cache_evictions_total', (), stats['evictions']),
+        ('gauge', 'diagnosis_cache_entries', (), stats['size'])
+    ]
+
+# Bumped on every catalog refresh so results built from an older catalog are never served
+catalog_state = {'generation': 0, 'fingerprint': None}
+catalog_state_lock = threading.Lock()
+
+def catalog_fingerprint(cursor):
+    """Checksum of the tables the diagnosis catalog and result cache are built from"""
+    cursor.execute("CHECKSUM TABLE disease, disease_symptom, medicines, precautions")
+    return tuple(cursor.fetchall())
+
+def refresh_catalog(cursor):
+    """Rebuild every in-process catalog cache after disease/treatment tables change.
+
+    The fingerprint is recorded only once both caches are rebuilt, so a
+    failed rebuild is retried on the next check.
+    """
+    fingerprint = catalog_fingerprint(cursor)
+    index = symptom_index.build(cursor)
+    treatments = treatment_catalog.build(cursor)
+    with catalog_state_lock:
+        catalog_state['generation'] += 1
+        catalog_state['fingerprint'] = fingerprint
+        diagnosis_cache.clear()
+    return {
+        'diseases': len(index['diseases']),
+        'symptoms': len(index['postings']),
+        'medicines': sum(len(m) for m in treatments['medicines'].values()),
+        'precautions': sum(len(p) for p in treatments['precautions'].values())
+    }
+
+class CatalogWatcher:
+    """Polls the catalog checksum from a background thread and refreshes the caches on change"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def check(self):
+        """Refresh the catalog if its tables changed; returns whether a refresh ran"""
+        if symptom_index.peek() is None and treatment_catalog.peek() is None:
+            return False  # nothing cached yet; the first request loads the current tables
+        try:
+            conn = db_pool.borrow()
+            try:
+                cursor = conn.cursor()
+                changed = catalog_fingerprint(cursor) != catalog_state['fingerprint']
+                if changed:
+                    refresh_catalog(cursor)
+                cursor.close()
+            finally:
+                conn.close()
+        except Exception:
+            logger.exception("Catalog refresh failed; retrying in %.0fs", self.interval)
+            return False
+        return changed
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def start(self):
+        """Start the watcher on first use (disabled when the interval is <= 0)"""
+        if self._thread is None and self.interval > 0:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='catalog-watcher', daemon=True)
+                    self._thread.start()
+
+catalog_watcher = CatalogWatcher(CATALOG_CHECK_INTERVAL)
+
+def catalog_snapshot(cursor):
+    """Return (generation, symptom index, treatments) for scoring a request"""
+    catalog_watcher.start()
+    generation = catalog_state['generation']
+    return generation, symptom_index.get(cursor), treatment_catalog.get(cursor)
+
+def current_symptom_index():
+    """Symptom index snapshot, touching the database only to build it"""
+    catalog_watcher.start()
+    snapshot = symptom_index.peek()
+    if snapshot is not None:
+        return snapshot
+
+    conn = get_db_connection()
+    if not conn:
+        return snapshot
+    try:
+        cursor = conn.cursor()
+        snapshot = symptom_index.get(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    return snapshot
+
+def canonical_symptoms(symptoms):
+    """Sorted, de-duplicated symptom tuple used as the result cache key"""
+    return tuple(sorted(set(symptoms)))
+
+def use_matrix_engine(disease_count):
+    """Decide whether the vectorized matrix engine should score this catalog"""
+    if np is None or DIAGNOSIS_ENGINE == 'index':
+        return False
+    return DIAGNOSIS_ENGINE == 'matrix' or disease_count >= MATRIX_MIN_DISEASES
+
+def build_symptom_matrix(diseases):
+    """Compile the catalog into a bit-packed symptom x disease matrix"""
+    ordered = sorted(diseases.values(), key=lambda d: d['position'])
+    columns = {}
+    for disease in ordered:
+        for symptom in disease['symptoms']:
+            columns.setdefault(symptom, len(columns))
+
+    # One row per symptom so a request only unpacks the rows it mentions
+    dense = np.zeros((len(columns), len(ordered)), dtype=np.uint8)
+    for position, disease in enumerate(ordered):
+        for symptom in disease['symptom_set']:
+            dense[columns[symptom], position] = 1
+
+    return {
+        'columns': columns,
+        'packed': np.packbits(dense, axis=1),
+        'diseases': ordered,
+        'totals': np.array([len(d['symptoms']) for d in ordered], dtype=np.float64)
+    }
+
+def score_diseases_matrix(matrix, symptoms):
+    """Score every disease in one vectorized pass over the symptom matrix"""
+    weights = {}
+    for symptom in symptoms:
+        column = matrix['columns'].get(symptom)
+        if column is not None:
+            weights[column] = weights.get(column, 0) + 1
+    if not weights:
+        return []
+
+    rows = list(weights)
+    selected = np.unpackbits(matrix['packed'][rows], axis=1, count=len(matrix['diseases']))
+    matched = np.array([weights[r] for r in rows], dtype=np.int64) @ selected
+
+    hits = np.flatnonzero(matched)
+    matched_counts = matched[hits].astype(np.float64)
+    match_percentage = (matched_counts / matrix['totals'][hits]) * 100
+    patient_match_percentage = (matched_counts / len(symptoms)) * 100
+    weighted_score = (match_percentage * 0.7) + (patient_match_percentage * 0.3)
+
+    # Stable descending sort keeps catalog order for ties, like list.sort(reverse=True)
+    order = np.argsort(-weighted_score, kind='stable')
+
+    results = []
+    for i in order.tolist():
+        disease = matrix['diseases'][hits[i]]
+        matched_symptoms = [s for s in symptoms if s in disease['symptom_set']]
+        results.append((disease, matched_symptoms, match_percentage[i].item(),
+                        patient_match_percentage[i].item(), weighted_score[i].item()))
+    return results
+
+def score_diseases(snapshot, symptoms):
+    """Score only the diseases that share at least one symptom with the request"""
+    if snapshot['matrix'] is not None:
+        return score_diseases_matrix(snapshot['matrix'], symptoms)
+
+    diseases = snapshot['diseases']
+    postings = snapshot['postings']
+
+    candidates = set()
+    for symptom in set(symptoms):
+        candidates.update(postings.get(symptom, ()))
+
+    results = []
+    # Keep catalog order so ties rank the same way as the full scan did
+    for disease_id in sorted(candidates, key=lambda d: diseases[d]['position']):
+        disease = diseases[disease_id]
+        matched_symptoms = [s for s in symptoms if s in disease['symptom_set']]
+        match_percentage = (len(matched_symptoms) / len(disease['symptoms'])) * 100
+        patient_match_percentage = (len(matched_symptoms) / len(symptoms)) * 100
+        weighted_score = (match_percentage * 0.7) + (patient_match_percentage * 0.3)
+        results.append((disease, matched_symptoms, match_percentage, patient_match_percentage, weighted_score))
+
+    return results
+
+def build_diagnosis_results(snapshot, treatments, symptoms):
+    """Build the ranked /api/diagnose results for one symptom list"""
+    results = []
+    for disease, matched_symptoms, match_percentage, patient_match_percentage, weighted_score in score_diseases(snapshot, symptoms):
+        disease_id = disease['id']
+        results.append({
+            'disease': {
+                'id': disease_id,
+                'name': disease['name'],
+                'description': disease['description'],
+                'symptoms': list(disease['symptoms']),
+                'matched_symptoms': matched_symptoms,
+                'medicines': list(treatments['medicines'].get(disease_id, [])),
+                'precautions': list(treatments['precautions'].get(disease_id, [])),
+                'confidence': weighted_score / 100
+            },
+            'match_percentage': match_percentage,
+            'patient_match_percentage': patient_match_percentage,
+            'weighted_score': weighted_score
+        })
+
+    # Sort by weighted score
+    results.sort(key=lambda x: x['weighted_score'], reverse=True)
+    return results
+
+def get_diagnosis_results(catalog, symptoms):
+    """Ranked results for a symptom list, served from the result cache when possible"""
+    generation, snapshot, treatments = catalog
+    key = canonical_symptoms(symptoms)
+    results = diagnosis_cache.get(key, generation)
+    if results is None:
+        results = build_diagnosis_results(snapshot, treatments, list(key))
+        diagnosis_cache.put(key, generation, results)
+    return results
+
+def symptom_observation_row(patient_id, symptoms):
+    """Parameters for SYMPTOM_OBSERVATION_SQL"""
+    return (json.dumps(list(canonical_symptoms(symptoms))), patient_id)
+
+def symptom_observations_sql(count):
+    """One INSERT ... SELECT recording `count` observations for registered patients only.
+
+    Takes symptom_observation_row() parameters for each observation, flattened.
+    """
+    values = ' UNION ALL '.join(['SELECT %s AS symptoms, %s AS registration_id'] + ['SELECT %s, %s'] * (count - 1))
+    return f"""
+        INSERT INTO symptom_observations (registration_id, symptoms)
+        SELECT p.registration_id, v.symptoms
+        FROM ({values}) v
+        JOIN patient_table p ON p.registration_id = v.registration_id
+    """
+
+def existing_patient_ids(cursor, patient_ids):
+    """The subset of patient_ids that are registered, in one query"""
+    patient_ids = list(dict.fromkeys(patient_ids))
+    if not patient_ids:
+        return set()
+    placeholders = ', '.join(['%s'] * len(patient_ids))
+    cursor.execute(f"SELECT registration_id FROM patient_table WHERE registration_id IN ({placeholders})", patient_ids)
+    return {row[0] for row in cursor.fetchall()}
+
+def record_patient_symptoms(cursor, patient_id, symptoms):
+    """Append the submitted symptoms to the patient's observation log (caller commits).
+
+    Returns False (nothing written) when the patient is not registered.
+    """
+    cursor.execute(SYMPTOM_OBSERVATION_SQL, symptom_observation_row(patient_id, symptoms))
+    return cursor.rowcount > 0
+
+def latest_symptom_flags(cursor, patient_id):
+    """Latest observation as the legacy symptoms_table column tuple"""
+    cursor.execute("""
+        SELECT symptoms FROM symptom_observations
+        WHERE registration_id = %s
+        ORDER BY observed_at DESC, observation_id DESC
+        LIMIT 1
+    """, (patient_id,))
+    latest = cursor.fetchone()
+    if latest:
+        return list(symptom_flags(json.loads(latest[0]) if latest[0] else []))
+    return legacy_symptom_flags(cursor, patient_id)
+
+def legacy_symptom_flags(cursor, patient_id):
+    """symptoms_table row for patients diagnosed before the observation log existed"""
+    cursor.execute("SELECT * FROM symptoms_table WHERE registration_id = %s", (patient_id,))
+    legacy = cursor.fetchone()
+    return list(legacy[1:]) if legacy else []  # Skip registration_id
+
+# Dashboard rollups, maintained alongside the rows they summarize
+ANALYTICS_TOTAL_SQL = """
+    INSERT INTO analytics_totals (metric, value) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+"""
+DAILY_ACTIVITY_SQL = """
+    INSERT INTO daily_activity_stats (stat_date, consultation_count) VALUES (CURDATE(), 1)
+    ON DUPLICATE KEY UPDATE consultation_count = consultation_count + 1
+"""
+DISEASE_TOTAL_SQL = """
+    INSERT INTO disease_stats (disease_id, frequency) VALUES (%s, 1)
+    ON DUPLICATE KEY UPDATE frequency = frequency + 1
+"""
+
+# Plain INSERT ... VALUES so executemany sends every rank in one multi-row statement
+CONSULTATION_DIAGNOSIS_SQL = """
+    INSERT INTO consultation_diagnoses (consultation_id, disease_id, diagnosis_rank, score, consultation_date)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def diagnosis_entries(diagnosis_results):
+    """(disease_id, weighted_score) pairs named by a stored diagnosis, in rank order.
+
+    Accepts the ranked results list the frontend posts as well as the full
+    /api/diagnose object ({'results': [...], 'top_disease': {...}}).  Each
+    disease appears once; the score is None when the payload has none.
+    """
+    if isinstance(diagnosis_results, dict):
+        entries = diagnosis_results.get('results') or []
+        if not entries and isinstance(diagnosis_results.get('top_disease'), dict):
+            entries = [{'disease': diagnosis_results['top_disease']}]
+    elif isinstance(diagnosis_results, list):
+        entries = diagnosis_results
+    else:
+        return []
+
+    ranked = []
+    seen = set()
+    for entry in entries:
+        disease = entry.get('disease') if isinstance(entry, dict) else None
+        if not isinstance(disease, dict):
+            continue
+        try:
+            disease_id = int(disease.get('id'))
+        except (TypeError, ValueError):
+            continue
+        if disease_id in seen:
+            continue
+        seen.add(disease_id)
+
+        score = entry.get('weighted_score')
+        if score is None and disease.get('confidence') is not None:
+            score = disease['confidence'] * 100
+        try:
+            score = round(float(score), 4) if score is not None else None
+        except (TypeError, ValueError):
+            score = None
+        ranked.append((disease_id, score))
+    return ranked
+
+def consultation_diagnosis_rows(consultation_id, consultation_date, entries):
+    """Parameters for CONSULTATION_DIAGNOSIS_SQL, ranks starting at 1"""
+    return [(consultation_id, disease_id, rank, score, consultation_date)
+            for rank, (disease_id, score) in enumerate(entries, start=1)]
+
+def record_consultation_rollups(cursor, disease_ids):
+    """Count a new consultation and its diagnosed diseases in the rollups (caller commits)"""
+    cursor.execute(DAILY_ACTIVITY_SQL)
+    cursor.execute(ANALYTICS_TOTAL_SQL, ('consultations', 1))
+    if disease_ids:
+        # Fixed row order so concurrent consultations lock the counters in the same sequence
+        rows = [(disease_id,) for disease_id in sorted(disease_ids)]
+        cursor.executemany(DISEASE_TOTAL_SQL, rows)
+
+def record_patient_rollups(cursor, count):
+    """Count newly registered patients in the rollups (caller commits)"""
+    cursor.execute(ANALYTICS_TOTAL_SQL, ('patients', count))
+
+def encode_page_cursor(name, registration_id):
+    """Opaque keyset cursor for the row a page ended on"""
+    return base64.urlsafe_b64encode(json.dumps([name, registration_id]).encode()).decode()
+
+def like_prefix(value):
+    """LIKE pattern matching values that start with `value` literally"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+def decode_page_cursor(page_cursor):
+    """(name, registration_id) from encode_page_cursor; ValueError if malformed"""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(page_cursor.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not (isinstance(decoded, list) and len(decoded) == 2 and all(isinstance(part, str) for part in decoded)):
+        raise ValueError('Invalid cursor')
+    return decoded[0], decoded[1]
+
+def export_value(value):
+    """JSON-friendly form of a MySQL value for NDJSON exports"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+def select_export_columns(available):
+    """Columns named in ?columns= (all when absent); ValueError for unknown names"""
+    requested = request.args.get('columns')
+    if not requested:
+        return list(available)
+    columns = [column.strip() for column in requested.split(',') if column.strip()]
+    unknown = [column for column in columns if column not in available]
+    if unknown or not columns:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown) or '(none)'}")
+    return columns
+
+def stream_ndjson(conn, cursor, columns):
+    """Yield result rows as newline-delimited JSON, one fetchmany() chunk at a time"""
+    try:
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            lines = []
+            for row in rows:
+                record = {}
+                for column, value in zip(columns, row):
+                    value = export_value(value)
+                    if column in EXPORT_JSON_COLUMNS and isinstance(value, str):
+                        value = json.loads(value)
+                    record[column] = value
+                lines.append(json.dumps(record))
+            yield '\n'.join(lines) + '\n'
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass  # client went away mid-stream; the pool discards the connection
+        conn.close()
+
+# Bulk patient import
+PATIENT_INSERT_SQL = "INSERT INTO patient_table (registration_id, name, gender, age, contact) VALUES (%s, %s, %s, %s, %s)"
+SYMPTOM_ROW_INSERT_SQL = "INSERT INTO symptoms_table (registration_id) VALUES (%s)"
+
+def read_import_rows(stream, fmt):
+    """Yield (line_number, row_dict, error) from a CSV or NDJSON text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as err:
+                yield line_number, None, f'Invalid JSON: {err}'
+                continue
+            if isinstance(row, dict):
+                yield line_number, row, None
+            else:
+                yield line_number, None, 'Each line must be a JSON object'
+    else:
+        raise ValueError('format must be csv or ndjson')
+
+def validate_patient_row(row):
+    """(name, gender, age, contact) ready to insert, or (None, error)"""
+    name = str(row.get('name') or '').strip()
+    gender = str(row.get('gender') or '').strip()
+    contact = str(row.get('contact') or '').strip()
+    if not name or not gender or not contact or row.get('age') in (None, ''):
+        return None, 'name, age, gender and contact are required'
+    try:
+        age = int(row.get('age'))
+    except (TypeError, ValueError):
+        return None, 'age must be a whole number'
+    if not 0 <= age <= 150:
+        return None, 'age must be between 0 and 150'
+    if len(name) > 100 or len(gender) > 10 or len(contact) > 15:
+        return None, 'name, gender or contact is too long'
+    return (name, gender, age, contact), None
+
+class RegistrationIdAllocator:
+    """Collision-free registration IDs from blocks reserved in the id_sequences table"""
+
+    ALPHABET = string.digits + string.ascii_uppercase
+    LENGTH = 8
+    SPACE = 36 ** 8
+    # Coprime with 36, so n -> (n * MULTIPLIER + OFFSET) mod SPACE is a bijection that
+    # scatters consecutive sequence numbers across the 8-character ID space
+    MULTIPLIER = 1779033703
+    OFFSET = 1580030173
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self.reservations = 0
+
+    def encode(self, number):
+        value = (number * self.MULTIPLIER + self.OFFSET) % self.SPACE
+        chars = []
+        for _ in range(self.LENGTH):
+            value, digit = divmod(value, 36)
+            chars.append(self.ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    def _reserve(self, size, conn=None):
+        """Claim [start, end) from the shared sequence in its own short transaction.
+
+        Uses `conn` when given (it must have no uncommitted work, as this
+        commits it); otherwise borrows a pooled connection for the update.
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = get_db_connection()
+            if not conn:
+                raise RuntimeError('Database connection failed')
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE id_sequences SET next_value = LAST_INSERT_ID(next_value + %s)
+                WHERE sequence_name = 'registration_id'
+            """, (size,))
+            if cursor.rowcount == 0:
+                # First use on a database set up before the sequence existed
+                cursor.execute("INSERT IGNORE INTO id_sequences (sequence_name, next_value) VALUES ('registration_id', 1)")
+                cursor.execute("""
+                    UPDATE id_sequences SET next_value = LAST_INSERT_ID(next_value + %s)
+                    WHERE sequence_name = 'registration_id'
+                """, (size,))
+            cursor.execute("SELECT LAST_INSERT_ID()")
+            end = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        finally:
+            if own_conn:
+                conn.close()
+        return end - size, end
+
+    def allocate(self, count=1, conn=None):
+        """Return `count` new IDs, reserving another block only when this one runs out.
+
+        Reservations run outside the lock, so callers holding a pool slot
+        never queue behind one that is waiting for a connection.  Callers
+        already holding a pooled connection pass it as `conn` to reserve on.
+        """
+        with self._lock:
+            take = min(count, self._end - self._next)
+            ids = [self.encode(number) for number in range(self._next, self._next + take)]
+            self._next += take
+
+        while len(ids) < count:
+            start, end = self._reserve(max(self.block_size, count - len(ids)), conn)
+            take = min(count - len(ids), end - start)
+            ids.extend(self.encode(number) for number in range(start, start + take))
+            start += take
+            with self._lock:
+                self.reservations += 1
+                # Keep the remainder unless another caller refilled first (its leftover numbers are skipped)
+                if start < end and self._next >= self._end:
+                    self._next, self._end = start, end
+        return ids
+
+registration_ids = RegistrationIdAllocator(REGISTRATION_ID_BLOCK)
+
+def is_duplicate_key(err):
+    """Whether a MySQL error is a duplicate primary/unique key"""
+    return getattr(err, 'errno', None) == 1062
+
+def import_patients(conn, rows, batch_size=IMPORT_BATCH_SIZE, progress=None, include_ids=False):
+    """Insert validated patient rows in multi-row batches and report per-row errors"""
+    cursor = conn.cursor()
+    stats = {'received': 0, 'imported': 0, 'failed': 0, 'batches': 0, 'errors': []}
+    if include_ids:
+        stats['registration_ids'] = []
+    started = time.perf_counter()
+
+    def fail(line_number, error):
+        stats['failed'] += 1
+        if len(stats['errors']) < IMPORT_MAX_ERRORS:
+            stats['errors'].append({'line': line_number, 'error': error})
+
+    def flush(batch):
+        ids = registration_ids.allocate(len(batch), conn)
+        try:
+            cursor.executemany(PATIENT_INSERT_SQL, [(rid,) + values for rid, (_, values) in zip(ids, batch)])
+            cursor.executemany(SYMPTOM_ROW_INSERT_SQL, [(rid,) for rid in ids])
+            record_patient_rollups(cursor, len(batch))
+            conn.commit()
+            inserted = list(zip(batch, ids))
+        except mysql.connector.Error:
+            conn.rollback()
+            # Retry the batch row by row so only the offending rows are reported
+            inserted = []
+            for (line_number, values), rid in zip(batch, ids):
+                try:
+                    try:
+                        cursor.execute(PATIENT_INSERT_SQL, (rid,) + values)
+                    except mysql.connector.Error as err:
+                        if not is_duplicate_key(err):
+                            raise
+                        # Only a legacy randomly generated ID can clash; take the next one
+                        rid = registration_ids.allocate(conn=conn)[0]
+                        cursor.execute(PATIENT_INSERT_SQL, (rid,) + values)
+                    cursor.execute(SYMPTOM_ROW_INSERT_SQL, (rid,))
+                    record_patient_rollups(cursor, 1)
+                    conn.commit()
+                    inserted.append(((line_number, values), rid))
+                except mysql.connector.Error as err:
+                    conn.rollback()
+                    fail(line_number, str(err))
+
+        stats['imported'] += len(inserted)
+        if include_ids:
+            stats['registration_ids'].extend({'line': line_number, 'registration_id': rid} for (line_number, _), rid in inserted)
+        stats['batches'] += 1
+        if progress:
+            progress(stats, time.perf_counter() - started)
+
+    batch = []
+    for line_number, row, error in rows:
+        stats['received'] += 1
+        if error is None:
+            values, error = validate_patient_row(row)
+        if error:
+            fail(line_number, error)
+            continue
+        batch.append((line_number, values))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    cursor.close()
+    elapsed = time.perf_counter() - started
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(stats['imported'] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+# Health statistics
+class HealthStats:
+    """Table counts for the health endpoints, refreshed by a background thread"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._snapshot = None
+        self.refreshed_at = None
+        self.error = None
+
+    def refresh(self):
+        """Re-read the counts on a pooled connection; keeps the last good snapshot on failure"""
+        try:
+            conn = db_pool.borrow()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM disease")
+                disease_count = cursor.fetchone()[0]
+                cursor.execute("SELECT COUNT(*) FROM user_accounts")
+                user_count = cursor.fetchone()[0]
+                # Maintained on write; avoids scanning the consultations table
+                cursor.execute("SELECT value FROM analytics_totals WHERE metric = 'consultations'")
+                row = cursor.fetchone()
+                cursor.close()
+            finally:
+                conn.close()
+        except (mysql.connector.Error, PoolTimeout) as err:
+            self.error = str(err)
+            return False
+
+        self._snapshot = {
+            'diseases': disease_count,
+            'users': user_count,
+            'consultations': row[0] if row else 0
+        }
+        self.refreshed_at = time.time()
+        self.error = None
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+    def get(self):
+        """(counts or None, age in seconds or None), starting the refresher on first use"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self.refresh()
+                    self._thread = threading.Thread(target=self._run, name='health-stats', daemon=True)
+                    self._thread.start()
+        age = time.time() - self.refreshed_at if self.refreshed_at else None
+        return self._snapshot, age
+
+health_stats = HealthStats(HEALTH_STATS_INTERVAL)
 
 # Authentication middleware
+class RoleCache:
+    """Short-lived user_id -> (role, is_active) cache used by require_auth"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, role, is_active):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, (role, is_active))
+
+    def invalidate(self, user_id=None):
+        """Forget one account (or every account) after a role or status change"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+role_cache = RoleCache(ROLE_CACHE_TTL)
+
+@metrics.collector
+def role_cache_metrics():
+    return [
+        ('counter', 'role_cache_hits_total', (), role_cache.hits),
+        ('counter', 'role_cache_misses_total', (), role_cache.misses)
+    ]
+
+def resolve_account(user_id):
+    """(role, is_active) for a user, from the cache or user_accounts; None if the DB is unavailable"""
+    account = role_cache.get(user_id)
+    if account is not None:
+        return account
+    
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    cursor.execute("SELECT role, is_active FROM user_accounts WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    
+    account = (row[0], bool(row[1])) if row else (None, False)
+    role_cache.put(user_id, *account)
+    return account
+
 def require_auth(required_role=None):
     """Decorator to require authentication"""
     def decorator(f):
@@ -37,15 +1838,10 @@ def require_auth(required_role=None):
                 return jsonify({'success': False, 'error': 'Authentication required'}), 401
             
             if required_role:
-                conn = get_db_connection()
-                if conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT role FROM user_accounts WHERE user_id = %s", (session['user_id'],))
-                    user_role = cursor.fetchone()
-                    cursor.close()
-                    conn.close()
-                    
-                    if not user_role or user_role[0] not in required_role:
+                account = resolve_account(session['user_id'])
+                if account:
+                    role, is_active = account
+                    if not is_active or role not in required_role:
                         return jsonify({'success': False, 'error': 'Insufficient permissions'}), 403
             
             return f(*args, **kwargs)
@@ -85,6 +1881,7 @@ def auth_login():
             session['user_id'] = user[0]
             session['username'] = user[1]
             session['role'] = user[2]
+            role_cache.put(user[0], user[2], True)
             
             return jsonify({
                 'success': True,
@@ -150,6 +1947,45 @@ def auth_profile():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/users/<int:user_id>', methods=['PATCH'])
+@require_auth(['admin'])
+def update_user_account(user_id):
+    """Change a user's role or active status"""
+    try:
+        data = request.get_json() or {}
+        updates = []
+        params = []
+        
+        if 'role' in data:
+            if data['role'] not in ('admin', 'doctor', 'nurse', 'patient'):
+                return jsonify({'success': False, 'error': 'Invalid role'}), 400
+            updates.append("role = %s")
+            params.append(data['role'])
+        if 'is_active' in data:
+            updates.append("is_active = %s")
+            params.append(1 if data['is_active'] else 0)
+        
+        if not updates:
+            return jsonify({'success': False, 'error': 'Nothing to update'}), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+        
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE user_accounts SET {', '.join(updates)} WHERE user_id = %s", (*params, user_id))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        # Permission changes take effect on the next request in this process
+        role_cache.invalidate(user_id)
+        
+        return jsonify({'success': True, 'message': 'User updated successfully'})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # Basic API endpoints (for existing frontend compatibility)
 @app.route('/api/symptoms', methods=['GET'])
 def get_symptoms():
@@ -177,23 +2013,40 @@ def get_symptoms():
 def suggest_symptoms():
     """Get symptom suggestions based on query"""
     try:
-        query = request.args.get('q', '').lower()
+        query = normalize_symptom_query(request.args.get('q', ''))
         if not query:
             return jsonify({'success': False, 'error': 'Query parameter required'}), 400
         
-        conn = get_db_connection()
-        if not conn:
+        limit = request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        
+        # Served from the in-process suggestion index; no query per keystroke
+        snapshot = current_symptom_index()
+        if snapshot is None:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT symptom_name FROM disease_symptom WHERE symptom_name LIKE %s ORDER BY symptom_name", (f'%{query}%',))
-        suggestions = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
+        # mode=fuzzy ranks by edit distance; mode=auto falls back to it when nothing matches
+        mode = request.args.get('mode', 'exact')
+        if mode not in ('exact', 'fuzzy', 'auto'):
+            return jsonify({'success': False, 'error': 'mode must be exact, fuzzy or auto'}), 400
+        
+        suggestions = [] if mode == 'fuzzy' else snapshot['suggest'].suggest(query, limit)
+        if mode == 'fuzzy' or (mode == 'auto' and not suggestions):
+            matches, truncated = snapshot['suggest'].fuzzy(query, limit)
+            return jsonify({
+                'success': True,
+                'mode': 'fuzzy',
+                'suggestions': [match['symptom'] for match in matches],
+                'matches': matches,
+                'truncated': truncated,
+                'count': len(matches)
+            })
         
         return jsonify({
             'success': True,
-            'suggestions': suggestions
+            'mode': 'exact',
+            'suggestions': suggestions,
+            'count': len(suggestions)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -226,6 +2079,39 @@ def get_diseases():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/catalog/refresh', methods=['POST'])
+@require_auth(['admin'])
+def refresh_diagnosis_catalog():
+    """Reload the in-process diagnosis catalog after disease or treatment tables change"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+        
+        cursor = conn.cursor()
+        counts = refresh_catalog(cursor)
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'catalog': counts,
+            'catalog_generation': catalog_state['generation'],
+            'message': 'Diagnosis catalog refreshed'
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/diagnose/cache', methods=['GET'])
+@require_auth(['admin'])
+def diagnosis_cache_stats():
+    """Diagnosis result cache hit/miss counters"""
+    return jsonify({
+        'success': True,
+        'cache': diagnosis_cache.stats(),
+        'catalog_generation': catalog_state['generation']
+    })
+
 @app.route('/api/patient/register', methods=['POST'])
 def register_patient():
     """Register a new patient"""
@@ -236,39 +2122,44 @@ def register_patient():
         gender = data.get('gender')
         contact = data.get('contact')
         
-        print(f"DEBUG: Received data - name: {name}, age: {age}, gender: {gender}, contact: {contact}")
+        logger.debug("Registration request - name: %s, age: %s, gender: %s, contact: %s", name, age, gender, contact)
         
         if not all([name, age, gender, contact]):
             return jsonify({'success': False, 'error': 'All fields are required'}), 400
         
+        # Generate registration ID (from this worker's reserved block; no round trip).
+        # Allocated before taking a connection so a block reservation never
+        # waits for a pool slot while this request holds one.
+        registration_id = registration_ids.allocate()[0]
+        
+        logger.debug("Allocated registration_id %s", registration_id)
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
         cursor = conn.cursor()
         
-        # Generate registration ID
-        import random
-        import string
-        registration_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        
-        print(f"DEBUG: Generated registration_id: {registration_id}")
-        
         # Insert patient
-        cursor.execute("""
-            INSERT INTO patient_table (registration_id, name, gender, age, contact)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (registration_id, name, gender, age, contact))
+        try:
+            cursor.execute(PATIENT_INSERT_SQL, (registration_id, name, gender, age, contact))
+        except mysql.connector.Error as err:
+            if not is_duplicate_key(err):
+                raise
+            # Only a legacy randomly generated ID can clash; take the next one
+            registration_id = registration_ids.allocate(conn=conn)[0]
+            cursor.execute(PATIENT_INSERT_SQL, (registration_id, name, gender, age, contact))
         
-        print("DEBUG: Patient inserted successfully")
+        logger.debug("Patient %s inserted", registration_id)
         
         # Initialize symptoms table entry with all symptoms set to false
         cursor.execute("""
             INSERT INTO symptoms_table (registration_id) VALUES (%s)
         """, (registration_id,))
         
-        print("DEBUG: Symptoms table entry created")
+        logger.debug("Symptoms table entry created for %s", registration_id)
         
+        record_patient_rollups(cursor, 1)
         conn.commit()
         cursor.close()
         conn.close()
@@ -280,7 +2171,39 @@ def register_patient():
         })
         
     except Exception as e:
-        print(f"DEBUG: Error in register_patient: {str(e)}")
+        logger.exception("register_patient failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/patients/import', methods=['POST'])
+@require_auth(['admin'])
+def import_patients_endpoint():
+    """Bulk-register patients from a CSV or NDJSON request body"""
+    try:
+        fmt = request.args.get('format')
+        if not fmt:
+            fmt = 'ndjson' if 'ndjson' in (request.content_type or '') else 'csv'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'success': False, 'error': 'format must be csv or ndjson'}), 400
+        
+        batch_size = request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int)
+        batch_size = max(1, min(batch_size, 10000))
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+        
+        # Parse the upload as it streams in rather than buffering the whole body
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        stats = import_patients(conn, read_import_rows(stream, fmt), batch_size,
+                                include_ids=request.args.get('include_ids') == '1')
+        conn.close()
+        
+        return jsonify({
+            'success': stats['failed'] == 0,
+            'import': stats
+        })
+        
+    except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/diagnose', methods=['POST'])
@@ -291,7 +2214,7 @@ def diagnose_symptoms():
         symptoms = data.get('symptoms', [])
         patient_id = data.get('patient_id')
         
-        print(f"DEBUG: Diagnosis request - symptoms: {symptoms}, patient_id: {patient_id}")
+        logger.debug("Diagnosis request - symptoms: %s, patient_id: %s", symptoms, patient_id)
         
         if not symptoms:
             return jsonify({'success': False, 'error': 'Symptoms are required'}), 400
@@ -302,104 +2225,20 @@ def diagnose_symptoms():
         
         cursor = conn.cursor()
         
-        # Get all diseases and their symptoms
-        cursor.execute("""
-            SELECT d.disease_id, d.disease_name, d.description, ds.symptom_name
-            FROM disease d
-            JOIN disease_symptom ds ON d.disease_id = ds.disease_id
-        """)
-        
-        disease_symptoms = {}
-        for row in cursor.fetchall():
-            disease_id, disease_name, description, symptom = row
-            if disease_id not in disease_symptoms:
-                disease_symptoms[disease_id] = {
-                    'id': disease_id,
-                    'name': disease_name,
-                    'description': description,
-                    'symptoms': [],
-                    'matched_symptoms': [],
-                    'medicines': [],
-                    'precautions': []
-                }
-            disease_symptoms[disease_id]['symptoms'].append(symptom)
+        # Identical symptom sets are served from the result cache
+        results = get_diagnosis_results(catalog_snapshot(cursor), symptoms)
         
-        # Analyze symptoms for each disease
-        results = []
-        for disease_id, disease_data in disease_symptoms.items():
-            matched_symptoms = [s for s in symptoms if s in disease_data['symptoms']]
-            if matched_symptoms:
-                match_percentage = (len(matched_symptoms) / len(disease_data['symptoms'])) * 100
-                patient_match_percentage = (len(matched_symptoms) / len(symptoms)) * 100
-                weighted_score = (match_percentage * 0.7) + (patient_match_percentage * 0.3)
-                
-                # Get medicines for this disease
-                cursor.execute("SELECT medicine_name, dosage FROM medicines WHERE disease_id = %s", (disease_id,))
-                medicines = [{'name': row[0], 'dosage': row[1]} for row in cursor.fetchall()]
-                
-                # Get precautions for this disease
-                cursor.execute("SELECT precaution_text FROM precautions WHERE disease_id = %s", (disease_id,))
-                precautions = [row[0] for row in cursor.fetchall()]
-                
-                disease_data['matched_symptoms'] = matched_symptoms
-                disease_data['medicines'] = medicines
-                disease_data['precautions'] = precautions
-                disease_data['confidence'] = weighted_score / 100
-                
-                results.append({
-                    'disease': disease_data,
-                    'match_percentage': match_percentage,
-                    'patient_match_percentage': patient_match_percentage,
-                    'weighted_score': weighted_score
-                })
-        
-        # Sort by weighted score
-        results.sort(key=lambda x: x['weighted_score'], reverse=True)
-        
-        # Update symptoms table if patient_id provided
+        # Update symptoms table if patient_id provided (unknown patients are skipped, as before)
         if patient_id:
-            # First, reset all symptoms to false
-            cursor.execute("""
-                UPDATE symptoms_table 
-                SET fever = 0, high_fever = 0, mild_fever = 0, chills = 0, fatigue = 0,
-                    weakness = 0, body_ache = 0, body_pain = 0, night_sweats = 0, sweating = 0,
-                    weight_loss = 0, dry_cough = 0, wet_cough = 0, persistent_cough = 0,
-                    blood_in_cough = 0, chest_pain = 0, chest_tightness = 0, breathing_difficulty = 0,
-                    fast_breathing = 0, sore_throat = 0, runny_nose = 0, sneezing = 0,
-                    nasal_congestion = 0, nausea = 0, vomiting = 0, diarrhea = 0, constipation = 0,
-                    stomach_pain = 0, stomach_cramps = 0, loss_of_appetite = 0, appetite_loss = 0,
-                    dehydration = 0, dizziness = 0, headache = 0, confusion = 0, rash = 0,
-                    skin_rash = 0, skin_blisters = 0, red_eyes = 0, watery_eyes = 0, itchy_eyes = 0,
-                    itchy_throat = 0, eye_pain = 0, ear_pain = 0, bleeding_gums = 0, low_platelet = 0,
-                    difficulty_swallowing = 0, swollen_tonsils = 0, white_spots_mouth = 0
-                WHERE registration_id = %s
-            """, (patient_id,))
-            
-            # Then set the specific symptoms to true
-            for symptom in symptoms:
-                if symptom in ['fever', 'high_fever', 'mild_fever', 'chills', 'fatigue', 'weakness', 
-                              'body_ache', 'body_pain', 'night_sweats', 'sweating', 'weight_loss',
-                              'dry_cough', 'wet_cough', 'persistent_cough', 'blood_in_cough',
-                              'chest_pain', 'chest_tightness', 'breathing_difficulty', 'fast_breathing',
-                              'sore_throat', 'runny_nose', 'sneezing', 'nasal_congestion', 'nausea',
-                              'vomiting', 'diarrhea', 'constipation', 'stomach_pain', 'stomach_cramps',
-                              'loss_of_appetite', 'appetite_loss', 'dehydration', 'dizziness',
-                              'headache', 'confusion', 'rash', 'skin_rash', 'skin_blisters',
-                              'red_eyes', 'watery_eyes', 'itchy_eyes', 'itchy_throat', 'eye_pain',
-                              'ear_pain', 'bleeding_gums', 'low_platelet', 'difficulty_swallowing',
-                              'swollen_tonsils', 'white_spots_mouth']:
-                    cursor.execute(f"""
-                        UPDATE symptoms_table 
-                        SET {symptom} = 1 
-                        WHERE registration_id = %s
-                    """, (patient_id,))
-            
-            conn.commit()
+            if record_patient_symptoms(cursor, patient_id, symptoms):
+                conn.commit()
+            else:
+                logger.warning("Symptoms not recorded for unknown patient %s", patient_id)
         
         cursor.close()
         conn.close()
         
-        print(f"DEBUG: Diagnosis completed - found {len(results)} matching diseases")
+        logger.debug("Diagnosis completed - found %d matching diseases", len(results))
         
         return jsonify({
             'success': True,
@@ -408,7 +2247,87 @@ def diagnose_symptoms():
         })
         
     except Exception as e:
-        print(f"DEBUG: Error in diagnose_symptoms: {str(e)}")
+        logger.exception("diagnose_symptoms failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    """Diagnose many patients against one catalog snapshot"""
+    try:
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else data
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'A non-empty list of items is required'}), 400
+        if len(items) > DIAGNOSE_BATCH_LIMIT:
+            return jsonify({'success': False, 'error': f'At most {DIAGNOSE_BATCH_LIMIT} items per batch'}), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+        
+        cursor = conn.cursor()
+        
+        # Every item is scored against the same catalog snapshot
+        catalog = catalog_snapshot(cursor)
+        
+        item_results = []
+        writes = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                item_results.append({'index': position, 'success': False, 'error': 'Item must be an object'})
+                continue
+            
+            patient_id = item.get('patient_id')
+            symptoms = item.get('symptoms', [])
+            if not symptoms or not isinstance(symptoms, list):
+                item_results.append({'index': position, 'patient_id': patient_id, 'success': False, 'error': 'Symptoms are required'})
+                continue
+            
+            results = get_diagnosis_results(catalog, symptoms)
+            item_results.append({
+                'index': position,
+                'patient_id': patient_id,
+                'success': True,
+                'results': results,
+                'top_disease': results[0]['disease'] if results else None
+            })
+            if patient_id:
+                writes.append((len(item_results) - 1, patient_id, symptoms))
+        
+        # All symptom-table writes go out as one statement in a single transaction;
+        # unknown patients insert nothing and fail only their own item
+        if writes:
+            try:
+                params = [value for _, patient_id, symptoms in writes for value in symptom_observation_row(patient_id, symptoms)]
+                cursor.execute(symptom_observations_sql(len(writes)), params)
+                if cursor.rowcount < len(writes):
+                    registered = existing_patient_ids(cursor, [patient_id for _, patient_id, _ in writes])
+                    for slot, patient_id, _ in writes:
+                        if patient_id not in registered:
+                            item_results[slot].update({'success': False, 'error': 'Patient not found'})
+                conn.commit()
+            except mysql.connector.Error as err:
+                conn.rollback()
+                cursor.close()
+                conn.close()
+                return jsonify({
+                    'success': False,
+                    'error': f'Failed to record symptoms: {err}',
+                    'items': item_results
+                }), 500
+        
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            'success': True,
+            'items': item_results,
+            'count': len(item_results),
+            'failed': sum(1 for item in item_results if not item['success'])
+        })
+        
+    except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Consultation Management Endpoints
@@ -436,19 +2355,42 @@ def create_consultation():
         
         # Create consultation
         cursor.execute("""
-            INSERT INTO consultations (patient_id, symptoms_analyzed, diagnosis_results, confidence_score, doctor_notes, follow_up_date)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            INSERT INTO consultations (patient_id, symptoms_analyzed, diagnosis_results, confidence_score, doctor_notes, doctor_id, follow_up_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
         """, (
             patient_id,
             json.dumps(symptoms),
             json.dumps(diagnosis_results),
             confidence_score,
             doctor_notes,
+            session['user_id'],
             follow_up_date
         ))
         
         consultation_id = cursor.lastrowid
         
+        # Keep the per-patient visit aggregate used by /api/patients current
+        cursor.execute("""
+            INSERT INTO patient_visit_stats (registration_id, consultation_count, last_visit)
+            VALUES (%s, 1, CURRENT_TIMESTAMP)
+            ON DUPLICATE KEY UPDATE consultation_count = consultation_count + 1, last_visit = CURRENT_TIMESTAMP
+        """, (patient_id,))
+        
+        # Ranked diagnoses as rows, for indexed disease analytics. The ids are
+        # client-posted, so only diseases in the current catalog are kept; a
+        # stale or bogus id would otherwise fail the foreign keys and the
+        # whole consultation with it.
+        known = symptom_index.get(cursor)['diseases']
+        entries = [entry for entry in diagnosis_entries(diagnosis_results) if entry[0] in known]
+        if entries:
+            # The row's server-assigned timestamp, so trends and rollups agree on the day
+            cursor.execute("SELECT consultation_date FROM consultations WHERE consultation_id = %s", (consultation_id,))
+            consultation_date = cursor.fetchone()[0]
+            cursor.executemany(CONSULTATION_DIAGNOSIS_SQL, consultation_diagnosis_rows(consultation_id, consultation_date, entries))
+        
+        # Dashboard rollups (daily counts and per-disease frequency)
+        record_consultation_rollups(cursor, [disease_id for disease_id, _ in entries])
+        
         # Create treatment plan if diagnosis exists
         if diagnosis_results and 'top_disease' in diagnosis_results:
             disease_id = diagnosis_results['top_disease'].get('id')
@@ -492,7 +2434,7 @@ def get_patient_consultations(patient_id):
                    c.confidence_score, c.doctor_notes, c.follow_up_date, c.status,
                    u.full_name as doctor_name
             FROM consultations c
-            LEFT JOIN user_accounts u ON c.doctor_notes LIKE CONCAT('%', u.full_name, '%')
+            LEFT JOIN user_accounts u ON u.user_id = c.doctor_id
             WHERE c.patient_id = %s
             ORDER BY c.consultation_date DESC
         """, (patient_id,))
@@ -527,26 +2469,90 @@ def get_patient_consultations(patient_id):
 @app.route('/api/patients', methods=['GET'])
 @require_auth(['doctor', 'nurse', 'admin'])
 def get_all_patients():
-    """Get all patients (for doctors/nurses)"""
+    """Get one page of patients (for doctors/nurses), ordered by name"""
     try:
+        limit = request.args.get('limit', PATIENTS_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, PATIENTS_PAGE_MAX))
+        
+        conditions = []
+        params = []
+        
+        # Keyset pagination on (name, registration_id) instead of OFFSET; name is
+        # NOT NULL (migration 5), so the seek predicate never skips a row
+        page_cursor = request.args.get('cursor')
+        if page_cursor:
+            try:
+                after_name, after_id = decode_page_cursor(page_cursor)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+            conditions.append("(p.name > %s OR (p.name = %s AND p.registration_id > %s))")
+            params.extend([after_name, after_name, after_id])
+        
+        gender = request.args.get('gender')
+        if gender:
+            conditions.append("p.gender = %s")
+            params.append(gender)
+        min_age = request.args.get('min_age', type=int)
+        if min_age is not None:
+            conditions.append("p.age >= %s")
+            params.append(min_age)
+        max_age = request.args.get('max_age', type=int)
+        if max_age is not None:
+            conditions.append("p.age <= %s")
+            params.append(max_age)
+        last_visit_from = request.args.get('last_visit_from')
+        if last_visit_from:
+            conditions.append("v.last_visit >= %s")
+            params.append(last_visit_from)
+        last_visit_to = request.args.get('last_visit_to')
+        if last_visit_to:
+            conditions.append("v.last_visit < %s")
+            params.append(last_visit_to)
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT p.registration_id, p.name, p.gender, p.age, p.contact,
-                   COUNT(c.consultation_id) as consultation_count,
-                   MAX(c.consultation_date) as last_visit
-            FROM patient_table p
-            LEFT JOIN consultations c ON p.registration_id = c.patient_id
-            GROUP BY p.registration_id
-            ORDER BY p.name
-        """)
+        # Prefix search on name or registration_id. Each runs as its own branch
+        # (a range scan on idx_patient_name or the primary key) because an OR
+        # of the two falls back to scanning the whole name index.
+        search = (request.args.get('q') or '').strip()
+        branches = [("p.name LIKE %s", like_prefix(search)), ("p.registration_id LIKE %s", like_prefix(search))] if search else [None]
+        
+        # One extra row tells us whether another page exists
+        queries = []
+        query_params = []
+        for branch in branches:
+            branch_conditions = conditions + [branch[0]] if branch else conditions
+            where = f"WHERE {' AND '.join(branch_conditions)}" if branch_conditions else ""
+            queries.append(f"""
+                SELECT p.registration_id, p.name, p.gender, p.age, p.contact,
+                       COALESCE(v.consultation_count, 0) as consultation_count,
+                       v.last_visit
+                FROM patient_table p
+                LEFT JOIN patient_visit_stats v ON v.registration_id = p.registration_id
+                {where}
+                ORDER BY p.name, p.registration_id
+                LIMIT %s
+            """)
+            query_params.extend([*params, *([branch[1]] if branch else []), limit + 1])
+        if len(queries) > 1:
+            queries = [f"""
+                SELECT * FROM ({' UNION '.join(f'({query})' for query in queries)}) m
+                ORDER BY m.name, m.registration_id
+                LIMIT %s
+            """]
+            query_params.append(limit + 1)
+        cursor.execute(queries[0], tuple(query_params))
+        
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         patients = []
-        for row in cursor.fetchall():
+        for row in rows:
             patients.append({
                 'registration_id': row[0],
                 'name': row[1],
@@ -563,56 +2569,180 @@ def get_all_patients():
         return jsonify({
             'success': True,
             'patients': patients,
-            'count': len(patients)
+            'count': len(patients),
+            'has_more': has_more,
+            'next_cursor': encode_page_cursor(rows[-1][1], rows[-1][0]) if has_more else None
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/patients/<patient_id>/summary', methods=['GET'])
-@require_auth(['doctor', 'nurse', 'admin'])
-def get_patient_summary(patient_id):
-    """Get comprehensive patient summary"""
+# Export Endpoints
+@app.route('/api/export/patients', methods=['GET'])
+@require_auth(['admin'])
+def export_patients():
+    """Stream the patient registry as NDJSON (filter with columns, last_visit_from/to)"""
     try:
+        columns = select_export_columns(PATIENT_EXPORT_COLUMNS)
+        
+        conditions = []
+        params = []
+        if request.args.get('last_visit_from'):
+            conditions.append("v.last_visit >= %s")
+            params.append(request.args['last_visit_from'])
+        if request.args.get('last_visit_to'):
+            conditions.append("v.last_visit < %s")
+            params.append(request.args['last_visit_to'])
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
-        cursor = conn.cursor()
+        # Unbuffered cursor: rows stay on the server until fetchmany() asks for them
+        cursor = conn.cursor(buffered=False)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"""
+            SELECT {', '.join(PATIENT_EXPORT_COLUMNS[column] for column in columns)}
+            FROM patient_table p
+            LEFT JOIN patient_visit_stats v ON v.registration_id = p.registration_id
+            {where}
+            ORDER BY p.registration_id
+        """, tuple(params))
+        
+        return Response(stream_with_context(stream_ndjson(conn, cursor, columns)), mimetype='application/x-ndjson')
+    except ValueError as err:
+        return jsonify({'success': False, 'error': str(err)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/export/consultations', methods=['GET'])
+@require_auth(['admin'])
+def export_consultations():
+    """Stream consultation history as NDJSON (filter with columns, from/to on consultation_date)"""
+    try:
+        columns = select_export_columns(CONSULTATION_EXPORT_COLUMNS)
+        
+        conditions = []
+        params = []
+        if request.args.get('from'):
+            conditions.append("c.consultation_date >= %s")
+            params.append(request.args['from'])
+        if request.args.get('to'):
+            conditions.append("c.consultation_date < %s")
+            params.append(request.args['to'])
+        if request.args.get('patient_id'):
+            conditions.append("c.patient_id = %s")
+            params.append(request.args['patient_id'])
         
-        # Get patient info
-        cursor.execute("SELECT * FROM patient_table WHERE registration_id = %s", (patient_id,))
-        patient = cursor.fetchone()
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
-        if not patient:
-            return jsonify({'success': False, 'error': 'Patient not found'}), 404
+        cursor = conn.cursor(buffered=False)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"""
+            SELECT {', '.join(CONSULTATION_EXPORT_COLUMNS[column] for column in columns)}
+            FROM consultations c
+            {where}
+            ORDER BY c.consultation_id
+        """, tuple(params))
         
-        # Get consultation history
-        cursor.execute("""
-            SELECT consultation_date, symptoms_analyzed, diagnosis_results, confidence_score, status
-            FROM consultations 
-            WHERE patient_id = %s 
-            ORDER BY consultation_date DESC
-        """, (patient_id,))
+        return Response(stream_with_context(stream_ndjson(conn, cursor, columns)), mimetype='application/x-ndjson')
+    except ValueError as err:
+        return jsonify({'success': False, 'error': str(err)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/patients/<patient_id>/summary', methods=['GET'])
+@require_auth(['doctor', 'nurse', 'admin'])
+def get_patient_summary(patient_id):
+    """Get comprehensive patient summary"""
+    try:
+        history_limit = min(request.args.get('history_limit', SYMPTOM_HISTORY_LIMIT, type=int), SYMPTOM_HISTORY_MAX)
+        history_before = request.args.get('history_before')
         
-        consultations = []
-        for row in cursor.fetchall():
-            consultations.append({
+        # Get patient info
+        def patient_info(cursor):
+            cursor.execute("SELECT * FROM patient_table WHERE registration_id = %s", (patient_id,))
+            return cursor.fetchone()
+        
+        # Get consultation history
+        def consultation_history(cursor):
+            cursor.execute("""
+                SELECT consultation_date, symptoms_analyzed, diagnosis_results, confidence_score, status
+                FROM consultations 
+                WHERE patient_id = %s 
+                ORDER BY consultation_date DESC
+            """, (patient_id,))
+            return [{
                 'date': row[0].isoformat() if row[0] else None,
                 'symptoms': json.loads(row[1]) if row[1] else [],
                 'diagnosis': json.loads(row[2]) if row[2] else {},
                 'confidence': float(row[3]) if row[3] else 0.0,
                 'status': row[4]
-            })
+            } for row in cursor.fetchall()]
         
-        # Get symptoms history
-        cursor.execute("SELECT * FROM symptoms_table WHERE registration_id = %s", (patient_id,))
-        symptoms = cursor.fetchone()
+        # Get symptoms history (newest first, bounded by the (registration_id, observed_at) index)
+        def symptom_history(cursor):
+            if history_before:
+                cursor.execute("""
+                    SELECT observed_at, symptoms
+                    FROM symptom_observations
+                    WHERE registration_id = %s AND observed_at < %s
+                    ORDER BY observed_at DESC, observation_id DESC
+                    LIMIT %s
+                """, (patient_id, history_before, max(history_limit, 1)))
+            else:
+                cursor.execute("""
+                    SELECT observed_at, symptoms
+                    FROM symptom_observations
+                    WHERE registration_id = %s
+                    ORDER BY observed_at DESC, observation_id DESC
+                    LIMIT %s
+                """, (patient_id, max(history_limit, 1)))
+            return [{
+                'observed_at': row[0].isoformat() if row[0] else None,
+                'symptoms': json.loads(row[1]) if row[1] else []
+            } for row in cursor.fetchall()]
+        
+        tasks = {
+            'patient': patient_info,
+            'consultations': consultation_history,
+            'observations': symptom_history
+        }
+        # A page of older history does not contain the latest observation; fetch it alongside.
+        # Otherwise the legacy symptoms_table row is read in the same round, for
+        # patients diagnosed before the observation log existed.
+        if history_before:
+            tasks['latest'] = lambda cursor: latest_symptom_flags(cursor, patient_id)
+        else:
+            tasks['legacy'] = lambda cursor: legacy_symptom_flags(cursor, patient_id)
+        results, errors = fan_out_queries(tasks)
         
-        cursor.close()
-        conn.close()
+        if 'patient' in errors:
+            return jsonify({'success': False, 'error': errors['patient']}), 500
+        patient = results['patient']
+        if not patient:
+            return jsonify({'success': False, 'error': 'Patient not found'}), 404
         
-        return jsonify({
+        consultations = results.get('consultations', [])
+        observations = results.get('observations', [])
+        
+        # Latest symptoms as the legacy symptoms_table column tuple
+        if history_before:
+            symptoms_history = results.get('latest', [])
+        elif observations:
+            symptoms_history = list(symptom_flags(observations[0]['symptoms']))
+        elif 'observations' in errors:
+            symptoms_history = []
+        else:
+            symptoms_history = results.get('legacy', [])
+        
+        # The legacy row only matters when there are no observations
+        if observations or 'observations' in errors:
+            errors.pop('legacy', None)
+        
+        response = {
             'success': True,
             'patient': {
                 'registration_id': patient[0],
@@ -622,9 +2752,14 @@ def get_patient_summary(patient_id):
                 'contact': patient[4]
             },
             'consultations': consultations,
-            'symptoms_history': symptoms[1:] if symptoms else [],  # Skip registration_id
-            'total_consultations': len(consultations)
-        })
+            'symptoms_history': symptoms_history,
+            'symptom_observations': observations,
+            'total_consultations': len(consultations),
+            'partial': bool(errors)
+        }
+        if errors:
+            response['errors'] = errors
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -635,58 +2770,112 @@ def get_patient_summary(patient_id):
 def get_dashboard_analytics():
     """Get dashboard analytics"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
-        
-        cursor = conn.cursor()
+        def total_patients(cursor):
+            cursor.execute("SELECT value FROM analytics_totals WHERE metric = 'patients'")
+            row = cursor.fetchone()
+            return row[0] if row else 0
         
-        # Total patients
-        cursor.execute("SELECT COUNT(*) FROM patient_table")
-        total_patients = cursor.fetchone()[0]
+        def today_consultations(cursor):
+            cursor.execute("SELECT COALESCE(SUM(consultation_count), 0) FROM daily_activity_stats WHERE stat_date = CURDATE()")
+            return int(cursor.fetchone()[0])
         
-        # Total consultations today
-        cursor.execute("SELECT COUNT(*) FROM consultations WHERE DATE(consultation_date) = CURDATE()")
-        today_consultations = cursor.fetchone()[0]
+        def month_consultations(cursor):
+            cursor.execute("""
+                SELECT COALESCE(SUM(consultation_count), 0) FROM daily_activity_stats
+                WHERE stat_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01') AND stat_date <= CURDATE()
+            """)
+            return int(cursor.fetchone()[0])
         
-        # Total consultations this month
-        cursor.execute("SELECT COUNT(*) FROM consultations WHERE MONTH(consultation_date) = MONTH(CURDATE())")
-        month_consultations = cursor.fetchone()[0]
+        def common_diseases(cursor):
+            cursor.execute("""
+                SELECT d.disease_name, s.frequency
+                FROM disease_stats s
+                JOIN disease d ON s.disease_id = d.disease_id
+                ORDER BY s.frequency DESC
+                LIMIT 5
+            """)
+            return [{'disease': row[0], 'frequency': row[1]} for row in cursor.fetchall()]
+        
+        def recent_consultations(cursor):
+            cursor.execute("""
+                SELECT c.consultation_date, p.name, c.confidence_score, c.status
+                FROM consultations c
+                JOIN patient_table p ON c.patient_id = p.registration_id
+                ORDER BY c.consultation_date DESC
+                LIMIT 10
+            """)
+            return [{
+                'date': row[0].isoformat() if row[0] else None,
+                'patient_name': row[1],
+                'confidence': float(row[2]) if row[2] else 0.0,
+                'status': row[3]
+            } for row in cursor.fetchall()]
+        
+        # Independent queries, each on its own pooled connection
+        tasks = {
+            'total_patients': total_patients,
+            'today_consultations': today_consultations,
+            'month_consultations': month_consultations,
+            'common_diseases': common_diseases,
+            'recent_consultations': recent_consultations
+        }
+        results, errors = fan_out_queries(tasks)
+        if not results:
+            return jsonify({'success': False, 'error': 'Database connection failed', 'errors': errors}), 500
+        
+        response = {
+            'success': True,
+            'analytics': {name: results.get(name) for name in tasks},
+            'partial': bool(errors)
+        }
+        if errors:
+            response['errors'] = errors
+        return jsonify(response)
         
-        # Most common diseases
-        cursor.execute("""
-            SELECT d.disease_name, COUNT(*) as frequency
-            FROM consultations c
-            JOIN JSON_TABLE(c.diagnosis_results, '$[*].disease.id' COLUMNS (disease_id INT PATH '$')) as jt
-            JOIN disease d ON jt.disease_id = d.disease_id
-            GROUP BY d.disease_id, d.disease_name
-            ORDER BY frequency DESC
-            LIMIT 5
-        """)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/analytics/diseases/<int:disease_id>/trend', methods=['GET'])
+@require_auth(['admin', 'doctor'])
+def get_disease_trend(disease_id):
+    """Daily diagnosis counts for one disease (from/to on consultation_date, default last 30 days)"""
+    try:
+        conditions = ["cd.disease_id = %s"]
+        params = [disease_id]
+        if request.args.get('from'):
+            conditions.append("cd.consultation_date >= %s")
+            params.append(request.args['from'])
+        else:
+            conditions.append("cd.consultation_date >= CURDATE() - INTERVAL 30 DAY")
+        if request.args.get('to'):
+            conditions.append("cd.consultation_date < %s")
+            params.append(request.args['to'])
         
-        common_diseases = []
-        for row in cursor.fetchall():
-            common_diseases.append({
-                'disease': row[0],
-                'frequency': row[1]
-            })
+        # Only count the disease when it ranked this high (1 = primary diagnosis)
+        max_rank = request.args.get('max_rank', type=int)
+        if max_rank:
+            conditions.append("cd.diagnosis_rank <= %s")
+            params.append(max_rank)
         
-        # Recent consultations
-        cursor.execute("""
-            SELECT c.consultation_date, p.name, c.confidence_score, c.status
-            FROM consultations c
-            JOIN patient_table p ON c.patient_id = p.registration_id
-            ORDER BY c.consultation_date DESC
-            LIMIT 10
-        """)
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
-        recent_consultations = []
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT DATE(cd.consultation_date) AS day, COUNT(*), AVG(cd.score)
+            FROM consultation_diagnoses cd
+            WHERE {' AND '.join(conditions)}
+            GROUP BY day
+            ORDER BY day
+        """, tuple(params))
+        
+        trend = []
         for row in cursor.fetchall():
-            recent_consultations.append({
+            trend.append({
                 'date': row[0].isoformat() if row[0] else None,
-                'patient_name': row[1],
-                'confidence': float(row[2]) if row[2] else 0.0,
-                'status': row[3]
+                'count': row[1],
+                'average_score': float(row[2]) if row[2] is not None else None
             })
         
         cursor.close()
@@ -694,13 +2883,9 @@ def get_dashboard_analytics():
         
         return jsonify({
             'success': True,
-            'analytics': {
-                'total_patients': total_patients,
-                'today_consultations': today_consultations,
-                'month_consultations': month_consultations,
-                'common_diseases': common_diseases,
-                'recent_consultations': recent_consultations
-            }
+            'disease_id': disease_id,
+            'trend': trend,
+            'total': sum(day['count'] for day in trend)
         })
         
     except Exception as e:
@@ -709,34 +2894,15 @@ def get_dashboard_analytics():
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Enhanced health check endpoint"""
+    """Enhanced health check endpoint (counts come from the cached health statistics)"""
     try:
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            
-            # Get table counts
-            cursor.execute("SELECT COUNT(*) FROM disease")
-            disease_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM user_accounts")
-            user_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM consultations")
-            consultation_count = cursor.fetchone()[0]
-            
-            cursor.close()
-            conn.close()
-            
+        counts, _ = health_stats.get()
+        if counts and not health_stats.error:
             return jsonify({
                 'status': 'healthy',
                 'service': 'Enhanced Patient Diagnosis System',
                 'version': '2.0.0',
-                'database': {
-                    'diseases': disease_count,
-                    'users': user_count,
-                    'consultations': consultation_count
-                },
+                'database': counts,
                 'features': [
                     'AI-Powered Diagnosis',
                     'Patient History Tracking',
@@ -748,7 +2914,7 @@ def health_check():
         else:
             return jsonify({
                 'status': 'unhealthy',
-                'error': 'Database connection failed'
+                'error': health_stats.error or 'Database connection failed'
             }), 500
             
     except Exception as e:
@@ -757,6 +2923,55 @@ def health_check():
             'error': str(e)
         }), 500
 
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness probe: the process is serving requests (no I/O)"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness probe: a pooled connection can be borrowed and answers a ping"""
+    try:
+        conn = db_pool.borrow(timeout=HEALTH_READY_TIMEOUT)
+    except (mysql.connector.Error, PoolTimeout) as err:
+        return jsonify({'status': 'not ready', 'error': str(err)}), 503
+    try:
+        conn.ping()
+    except mysql.connector.Error as err:
+        return jsonify({'status': 'not ready', 'error': str(err)}), 503
+    finally:
+        conn.close()
+    return jsonify({'status': 'ready'})
+
+@app.route('/api/health/stats', methods=['GET'])
+def health_stats_endpoint():
+    """Cached table counts, refreshed every HEALTH_STATS_INTERVAL seconds"""
+    counts, age = health_stats.get()
+    if counts is None:
+        return jsonify({'success': False, 'error': health_stats.error or 'Statistics not available yet'}), 503
+    response = {
+        'success': True,
+        'database': counts,
+        'age_seconds': round(age, 1),
+        'refresh_interval': health_stats.interval
+    }
+    if health_stats.error:
+        response['last_error'] = health_stats.error
+    return jsonify(response)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape target (combined across workers when METRICS_DIR is set)"""
+    snapshots = metrics_publisher.collect() if metrics_publisher else [metrics.snapshot()]
+    body = render_prometheus(*merge_metric_snapshots(snapshots))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/db/pool', methods=['GET'])
+@require_auth(['admin'])
+def db_pool_stats():
+    """Connection pool usage statistics"""
+    return jsonify({'success': True, 'pool': db_pool.stats()})
+
 @app.route('/')
 def serve_index():
     return send_from_directory('.', 'index.html')
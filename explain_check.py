@@ -0,0 +1,127 @@
+import argparse
+import sys
+
+from enhanced_api import get_db_connection
+
+# Queries on the request path, with representative parameters and the
+# access types (EXPLAIN type) each may use.  Anything else, including a full
+# index scan ('index') where a lookup is expected, is reported as a
+# regression.  'index' is only allowed for ordered LIMIT reads and the
+# symptom vocabulary, which walk an index by design.  Run against a database
+# with realistic row counts: on near-empty tables MySQL may prefer a scan
+# regardless.
+PATIENT_PAGE_BRANCH = """
+    SELECT p.registration_id, p.name, v.consultation_count, v.last_visit
+    FROM patient_table p
+    LEFT JOIN patient_visit_stats v ON v.registration_id = p.registration_id
+    WHERE {condition}
+    ORDER BY p.name, p.registration_id
+    LIMIT 51
+"""
+
+HOT_QUERIES = [
+    ('symptom list', """
+        SELECT DISTINCT symptom_name FROM disease_symptom ORDER BY symptom_name
+    """, (), ('index', 'range')),
+    ('consultation history', """
+        SELECT c.consultation_id, c.consultation_date, u.full_name
+        FROM consultations c
+        LEFT JOIN user_accounts u ON u.user_id = c.doctor_id
+        WHERE c.patient_id = %s
+        ORDER BY c.consultation_date DESC
+    """, ('AAAAAAAA',), ('ref', 'eq_ref')),
+    ('patient summary consultations', """
+        SELECT consultation_date, symptoms_analyzed, diagnosis_results, confidence_score, status
+        FROM consultations
+        WHERE patient_id = %s
+        ORDER BY consultation_date DESC
+    """, ('AAAAAAAA',), ('ref',)),
+    ('symptom observations', """
+        SELECT observed_at, symptoms FROM symptom_observations
+        WHERE registration_id = %s
+        ORDER BY observed_at DESC, observation_id DESC
+        LIMIT 20
+    """, ('AAAAAAAA',), ('ref', 'range')),
+    ('patients page', PATIENT_PAGE_BRANCH.format(
+        condition="(p.name > %s OR (p.name = %s AND p.registration_id > %s))"
+    ), ('M', 'M', 'AAAAAAAA'), ('range', 'eq_ref')),
+    ('patients search', f"""
+        SELECT * FROM (({PATIENT_PAGE_BRANCH.format(condition="p.name LIKE %s")})
+                       UNION
+                       ({PATIENT_PAGE_BRANCH.format(condition="p.registration_id LIKE %s")})) m
+        ORDER BY m.name, m.registration_id
+        LIMIT 51
+    """, ('Jo%', 'Jo%'), ('range', 'eq_ref')),
+    ('recent consultations', """
+        SELECT c.consultation_date, p.name, c.confidence_score, c.status
+        FROM consultations c
+        JOIN patient_table p ON c.patient_id = p.registration_id
+        ORDER BY c.consultation_date DESC
+        LIMIT 10
+    """, (), ('index', 'eq_ref')),
+    ('month consultations', """
+        SELECT COALESCE(SUM(consultation_count), 0) FROM daily_activity_stats
+        WHERE stat_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01') AND stat_date <= CURDATE()
+    """, (), ('range',)),
+    ('common diseases', """
+        SELECT d.disease_name, s.frequency
+        FROM disease_stats s
+        JOIN disease d ON s.disease_id = d.disease_id
+        ORDER BY s.frequency DESC
+        LIMIT 5
+    """, (), ('index', 'eq_ref')),
+    ('disease trend', """
+        SELECT DATE(cd.consultation_date) AS day, COUNT(*)
+        FROM consultation_diagnoses cd
+        WHERE cd.disease_id = %s AND cd.consultation_date >= CURDATE() - INTERVAL 30 DAY
+        GROUP BY day
+    """, (1,), ('range', 'ref'))
+]
+
+def explain(cursor, sql, params):
+    """EXPLAIN rows as dicts"""
+    cursor.execute("EXPLAIN " + sql, params or None)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def check(conn, verbose=False):
+    """Run every hot query through EXPLAIN; returns the plan rows using a disallowed access type"""
+    cursor = conn.cursor()
+    failures = []
+    for name, sql, params, allowed in HOT_QUERIES:
+        for row in explain(cursor, sql, params):
+            if verbose:
+                print(f"  {name}: table={row.get('table')} type={row.get('type')} "
+                      f"key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+            # <derivedN>/<unionN,M> rows read the small temporary result of an inner query
+            if (row.get('table') or '').startswith('<'):
+                continue
+            if row.get('type') not in allowed:
+                failures.append(f"{name}: {row.get('type')} access on {row.get('table')} "
+                                f"(~{row.get('rows')} rows; allowed {', '.join(allowed)})")
+    cursor.close()
+    return failures
+
+def main():
+    """Fail (exit 1) if any hot query plans an access type it is not allowed"""
+    parser = argparse.ArgumentParser(description='EXPLAIN the hot queries and fail on unexpected scans')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan row')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        return 1
+
+    failures = check(conn, args.verbose)
+    conn.close()
+
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        return 1
+    print(f"[OK] {len(HOT_QUERIES)} hot queries use their expected index access")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import argparse
+import json
+import os
+import sys
+
+from enhanced_api import get_db_connection, import_patients, read_import_rows, IMPORT_BATCH_SIZE
+
+def main():
+    """Bulk-load patients from a CSV or NDJSON file"""
+    parser = argparse.ArgumentParser(description='Bulk import patients into patient_table')
+    parser.add_argument('path', help='CSV (name,age,gender,contact) or NDJSON file')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--ids-out', help='write line -> registration_id mapping as NDJSON')
+    args = parser.parse_args()
+
+    fmt = args.format or ('ndjson' if os.path.splitext(args.path)[1].lower() in ('.ndjson', '.jsonl') else 'csv')
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        return 1
+
+    def progress(stats, elapsed):
+        rate = stats['imported'] / elapsed if elapsed > 0 else 0.0
+        print(f"[IMPORT] batch {stats['batches']}: {stats['received']} rows read, "
+              f"{stats['imported']} imported, {stats['failed']} failed ({rate:.0f} rows/s)")
+
+    with open(args.path, 'r', encoding='utf-8', newline='') as file:
+        stats = import_patients(conn, read_import_rows(file, fmt), args.batch_size,
+                                progress=progress, include_ids=bool(args.ids_out))
+    conn.close()
+
+    if args.ids_out:
+        with open(args.ids_out, 'w', encoding='utf-8') as out:
+            for entry in stats.pop('registration_ids'):
+                out.write(json.dumps(entry) + '\n')
+
+    for error in stats['errors']:
+        print(f"[WARN] line {error['line']}: {error['error']}")
+    print(f"[DONE] {stats['imported']} imported, {stats['failed']} failed in "
+          f"{stats['elapsed_seconds']}s ({stats['rows_per_second']} rows/s)")
+    return 0 if stats['failed'] == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
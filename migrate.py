@@ -0,0 +1,174 @@
+import argparse
+import sys
+
+# Versioned schema changes applied on top of setup_database.py, in order.
+# Each entry is (version, description, steps); a step is (kind, table, name,
+# definition) and is skipped when the database already has it, so a step may
+# be added to a migration some databases have already applied.  'index' steps
+# take a column list and 'column' steps a column definition, both applied
+# online where InnoDB allows it; 'foreign_key' steps take "column REFERENCES
+# table(column)";
+# 'not_null' steps take the column type and fill existing NULLs with '';
+# 'drop_table' steps take only the table.
+MIGRATIONS = [
+    (1, 'Index disease_symptom by symptom name', [
+        ('index', 'disease_symptom', 'idx_disease_symptom_name', 'symptom_name, disease_id')
+    ]),
+    (2, 'Index consultations by date', [
+        ('index', 'consultations', 'idx_consultations_date', 'consultation_date')
+    ]),
+    (3, 'Index consultations by patient and date', [
+        ('index', 'consultations', 'idx_consultations_patient_date', 'patient_id, consultation_date')
+    ]),
+    (4, 'Add consultations.doctor_id referencing user_accounts', [
+        ('column', 'consultations', 'doctor_id', 'INT NULL AFTER doctor_notes'),
+        ('index', 'consultations', 'idx_consultations_doctor', 'doctor_id'),
+        ('foreign_key', 'consultations', 'fk_consultations_doctor', 'doctor_id REFERENCES user_accounts(user_id)')
+    ]),
+    (5, 'Make patient_table.name NOT NULL for keyset paging', [
+        ('not_null', 'patient_table', 'name', 'VARCHAR(100)')
+    ]),
+    (6, 'Drop the unread daily_disease_stats rollup', [
+        ('drop_table', 'daily_disease_stats', None, None)
+    ]),
+    (7, 'Index patient_table for keyset paging and filters', [
+        ('index', 'patient_table', 'idx_patient_name', 'name, registration_id'),
+        ('index', 'patient_table', 'idx_patient_gender_name', 'gender, name, registration_id'),
+        ('index', 'patient_table', 'idx_patient_age', 'age')
+    ])
+]
+
+def ensure_version_table(cursor):
+    """Create the schema_version bookkeeping table"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def current_version(cursor):
+    """Highest applied migration version (0 when none)"""
+    ensure_version_table(cursor)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+def add_index_online(cursor, table, index_name, columns):
+    """Build an index without blocking writes; skipped if it already exists"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    if cursor.fetchone()[0]:
+        print(f"[SKIP] Index {index_name} already exists on {table}")
+        return
+    cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE")
+    print(f"[OK] Created index {index_name} on {table}({columns})")
+
+def add_column_online(cursor, table, column, definition):
+    """Add a column without blocking writes; skipped if it already exists"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    if cursor.fetchone()[0]:
+        print(f"[SKIP] Column {table}.{column} already exists")
+        return
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}, ALGORITHM=INPLACE, LOCK=NONE")
+    print(f"[OK] Added column {table}.{column}")
+
+def add_foreign_key(cursor, table, constraint_name, definition):
+    """Add a foreign key unless the column already references that table (fresh installs)"""
+    column, reference = definition.split(' REFERENCES ')
+    referenced_table = reference.split('(')[0]
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.key_column_usage
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+          AND referenced_table_name = %s
+    """, (table, column, referenced_table))
+    if cursor.fetchone()[0]:
+        print(f"[SKIP] {table}.{column} already references {referenced_table}")
+        return
+    # Validating existing rows needs a table copy, so this one is not built online
+    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint_name} FOREIGN KEY ({column}) REFERENCES {reference}")
+    print(f"[OK] Created foreign key {constraint_name} on {table}({column})")
+
+def make_not_null(cursor, table, column, column_type):
+    """Replace NULLs with '' and declare the column NOT NULL; skipped if it already is"""
+    cursor.execute("""
+        SELECT is_nullable FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    if row is None or row[0] == 'NO':
+        print(f"[SKIP] {table}.{column} is already NOT NULL")
+        return
+    cursor.execute(f"UPDATE {table} SET {column} = '' WHERE {column} IS NULL")
+    cursor.execute(f"ALTER TABLE {table} MODIFY {column} {column_type} NOT NULL")
+    print(f"[OK] {table}.{column} is now NOT NULL")
+
+def drop_table(cursor, table, name, definition):
+    """Drop a table that is no longer used"""
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    print(f"[OK] Dropped table {table}")
+
+STEP_HANDLERS = {
+    'index': add_index_online,
+    'column': add_column_online,
+    'foreign_key': add_foreign_key,
+    'not_null': make_not_null,
+    'drop_table': drop_table
+}
+
+def apply_migrations(conn, target=None):
+    """Apply pending migrations up to target (default: latest); returns the new version.
+
+    DDL commits implicitly in MySQL, so each migration is recorded as soon
+    as it finishes; a failed run resumes from the last recorded version.
+    """
+    cursor = conn.cursor()
+    version = current_version(cursor)
+    for number, description, steps in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        print(f"[MIGRATE] {number}: {description}")
+        for kind, table, name, definition in steps:
+            STEP_HANDLERS[kind](cursor, table, name, definition)
+        cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)", (number, description))
+        conn.commit()
+        version = number
+    cursor.close()
+    return version
+
+def main():
+    """Bring the schema up to the latest version"""
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('--target', type=int, help='stop at this version')
+    parser.add_argument('--status', action='store_true', help='print the applied version and exit')
+    args = parser.parse_args()
+
+    # Imported here so setup_database can use apply_migrations without loading the app
+    from enhanced_api import get_db_connection
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        return 1
+
+    cursor = conn.cursor()
+    version = current_version(cursor)
+    cursor.close()
+    latest = MIGRATIONS[-1][0]
+    if args.status:
+        print(f"[DB] Schema version {version} (latest {latest})")
+        conn.close()
+        return 0
+
+    version = apply_migrations(conn, args.target)
+    conn.close()
+    print(f"[DONE] Schema at version {version} (latest {latest})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import json
+import sys
+
+from enhanced_api import (get_db_connection, diagnosis_entries, consultation_diagnosis_rows,
+                          CONSULTATION_DIAGNOSIS_SQL)
+
+def backfill_diagnoses(conn, batch_size):
+    """Write consultation_diagnoses rows for consultations stored before the table existed"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT disease_id FROM disease")
+    known = {row[0] for row in cursor.fetchall()}
+
+    scanned = written = 0
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT c.consultation_id, c.consultation_date, c.diagnosis_results
+            FROM consultations c
+            WHERE c.consultation_id > %s
+              AND NOT EXISTS (SELECT 1 FROM consultation_diagnoses cd WHERE cd.consultation_id = c.consultation_id)
+            ORDER BY c.consultation_id
+            LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        params = []
+        for consultation_id, consultation_date, diagnosis_results in rows:
+            try:
+                parsed = json.loads(diagnosis_results) if diagnosis_results else None
+            except ValueError:
+                parsed = None
+            entries = [entry for entry in diagnosis_entries(parsed) if entry[0] in known]
+            params.extend(consultation_diagnosis_rows(consultation_id, consultation_date, entries))
+        if params:
+            cursor.executemany(CONSULTATION_DIAGNOSIS_SQL, params)
+        conn.commit()
+
+        last_id = rows[-1][0]
+        scanned += len(rows)
+        written += len(params)
+        print(f"[ROLLUP] diagnoses: {scanned} consultations backfilled (up to id {last_id}), {written} rows")
+
+    cursor.close()
+    return scanned
+
+def rebuild(conn, batch_size):
+    """Recompute every dashboard rollup from the base tables.
+
+    consultation_diagnoses is backfilled first, then the rollups are
+    replaced from it in a single transaction.  Consultations created while
+    this runs may be counted twice, so run it while the app is idle (after
+    setup or a restore).
+    """
+    backfilled = backfill_diagnoses(conn, batch_size)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM daily_activity_stats")
+        cursor.execute("""
+            INSERT INTO daily_activity_stats (stat_date, consultation_count)
+            SELECT DATE(consultation_date), COUNT(*)
+            FROM consultations
+            WHERE consultation_date IS NOT NULL
+            GROUP BY DATE(consultation_date)
+        """)
+        days = cursor.rowcount
+
+        cursor.execute("DELETE FROM disease_stats")
+        cursor.execute("""
+            INSERT INTO disease_stats (disease_id, frequency)
+            SELECT disease_id, COUNT(*)
+            FROM consultation_diagnoses
+            GROUP BY disease_id
+        """)
+        diseases = cursor.rowcount
+
+        for metric, table in (('patients', 'patient_table'), ('consultations', 'consultations')):
+            cursor.execute(f"""
+                INSERT INTO analytics_totals (metric, value)
+                SELECT %s, COUNT(*) FROM {table}
+                ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """, (metric,))
+
+        cursor.execute("SELECT metric, value FROM analytics_totals")
+        totals = dict(cursor.fetchall())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return {
+        'patients': totals.get('patients', 0),
+        'consultations': totals.get('consultations', 0),
+        'backfilled': backfilled,
+        'days': days,
+        'diseases': diseases
+    }
+
+def main():
+    """Rebuild the dashboard analytics rollups from existing data"""
+    parser = argparse.ArgumentParser(description='Rebuild dashboard analytics rollup tables')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] Database connection failed")
+        return 1
+
+    stats = rebuild(conn, args.batch_size)
+    conn.close()
+
+    print(f"[DONE] {stats['patients']} patients, {stats['consultations']} consultations "
+          f"({stats['backfilled']} backfilled) over {stats['days']} days, {stats['diseases']} diseases")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,16 @@
 import mysql.connector
 import os
 
-def setup_database():
+from migrate import apply_migrations
+
+def setup_database(database='patient'):
     """Setup the patient database with all required tables and data"""
     
-    # Database configuration
+    # Database configuration (same environment overrides as enhanced_api.py)
     DB_CONFIG = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': 'password'
+        'host': os.environ.get('DB_HOST', 'localhost'),
+        'user': os.environ.get('DB_USER', 'root'),
+        'password': os.environ.get('DB_PASSWORD', 'password')
     }
     
     try:
@@ -19,10 +21,10 @@ def setup_database():
         print("[DB] Setting up database...")
         
         # Create database if it doesn't exist
-        cursor.execute("CREATE DATABASE IF NOT EXISTS patient")
-        cursor.execute("USE patient")
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+        cursor.execute(f"USE {database}")
         
-        print("[OK] Database 'patient' created/verified")
+        print(f"[OK] Database '{database}' created/verified")
         
         # Read and execute the SQL file
         with open('Patient_entry.sql', 'r') as file:
@@ -33,6 +35,9 @@ def setup_database():
         
         for statement in statements:
             statement = statement.strip()
+            # The script's own CREATE DATABASE/USE would switch away from the target database
+            if statement.upper().startswith(('CREATE DATABASE', 'USE ')):
+                continue
             if statement and not statement.startswith('--'):
                 try:
                     cursor.execute(statement)
@@ -69,10 +74,13 @@ def setup_database():
                 diagnosis_results JSON,
                 confidence_score DECIMAL(5,4),
                 doctor_notes TEXT,
+                doctor_id INT NULL,
                 follow_up_date DATE,
                 status ENUM('pending', 'completed', 'cancelled') DEFAULT 'pending',
                 consultation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (patient_id) REFERENCES patient_table(registration_id)
+                INDEX idx_consultations_doctor (doctor_id),
+                FOREIGN KEY (patient_id) REFERENCES patient_table(registration_id),
+                CONSTRAINT fk_consultations_doctor FOREIGN KEY (doctor_id) REFERENCES user_accounts(user_id)
             )
         """)
         
@@ -91,6 +99,117 @@ def setup_database():
             )
         """)
         
+        # Append-only symptom observation log (replaces overwriting symptoms_table)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS symptom_observations (
+                observation_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+                registration_id VARCHAR(10) NOT NULL,
+                observed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                symptoms JSON NOT NULL,
+                INDEX idx_observations_patient_time (registration_id, observed_at),
+                FOREIGN KEY (registration_id) REFERENCES patient_table(registration_id)
+            )
+        """)
+        
+        # Latest observation per patient, for callers that only need current symptoms
+        cursor.execute("""
+            CREATE OR REPLACE VIEW latest_symptom_observations AS
+            SELECT o.registration_id, o.observed_at, o.symptoms
+            FROM symptom_observations o
+            WHERE o.observation_id = (
+                SELECT o2.observation_id
+                FROM symptom_observations o2
+                WHERE o2.registration_id = o.registration_id
+                ORDER BY o2.observed_at DESC, o2.observation_id DESC
+                LIMIT 1
+            )
+        """)
+        
+        # Per-patient visit aggregate maintained by create_consultation
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS patient_visit_stats (
+                registration_id VARCHAR(10) PRIMARY KEY,
+                consultation_count INT NOT NULL DEFAULT 0,
+                last_visit TIMESTAMP NULL,
+                INDEX idx_visit_stats_last_visit (last_visit),
+                FOREIGN KEY (registration_id) REFERENCES patient_table(registration_id)
+            )
+        """)
+        
+        # Rebuild the aggregate from existing consultations
+        cursor.execute("""
+            INSERT INTO patient_visit_stats (registration_id, consultation_count, last_visit)
+            SELECT patient_id, COUNT(*), MAX(consultation_date)
+            FROM consultations
+            WHERE patient_id IS NOT NULL
+            GROUP BY patient_id
+            ON DUPLICATE KEY UPDATE consultation_count = VALUES(consultation_count), last_visit = VALUES(last_visit)
+        """)
+        
+        # Ranked diagnoses per consultation (replaces JSON_TABLE over diagnosis_results)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS consultation_diagnoses (
+                consultation_id INT NOT NULL,
+                diagnosis_rank SMALLINT NOT NULL,
+                disease_id INT NOT NULL,
+                score DECIMAL(7,4) NULL,
+                consultation_date TIMESTAMP NULL,
+                PRIMARY KEY (consultation_id, diagnosis_rank),
+                INDEX idx_diagnoses_disease_date (disease_id, consultation_date),
+                FOREIGN KEY (consultation_id) REFERENCES consultations(consultation_id),
+                FOREIGN KEY (disease_id) REFERENCES disease(disease_id)
+            )
+        """)
+        
+        # Dashboard rollups maintained on write (rebuild with rebuild_rollups.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_totals (
+                metric VARCHAR(32) PRIMARY KEY,
+                value BIGINT NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_activity_stats (
+                stat_date DATE PRIMARY KEY,
+                consultation_count INT NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS disease_stats (
+                disease_id INT PRIMARY KEY,
+                frequency INT NOT NULL DEFAULT 0,
+                INDEX idx_disease_stats_frequency (frequency),
+                FOREIGN KEY (disease_id) REFERENCES disease(disease_id)
+            )
+        """)
+        
+        # Seed the scalar totals and daily counts; rebuild_rollups.py backfills the diagnoses
+        for metric, table in (('patients', 'patient_table'), ('consultations', 'consultations')):
+            cursor.execute(f"""
+                INSERT INTO analytics_totals (metric, value)
+                SELECT %s, COUNT(*) FROM {table}
+                ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """, (metric,))
+        cursor.execute("""
+            INSERT INTO daily_activity_stats (stat_date, consultation_count)
+            SELECT DATE(consultation_date), COUNT(*)
+            FROM consultations
+            WHERE consultation_date IS NOT NULL
+            GROUP BY DATE(consultation_date)
+            ON DUPLICATE KEY UPDATE consultation_count = VALUES(consultation_count)
+        """)
+        
+        # Sequences handed out in blocks (registration IDs)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS id_sequences (
+                sequence_name VARCHAR(32) PRIMARY KEY,
+                next_value BIGINT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            INSERT IGNORE INTO id_sequences (sequence_name, next_value) VALUES ('registration_id', 1)
+        """)
+        
         # Insert default admin user
         cursor.execute("""
             INSERT IGNORE INTO user_accounts (username, password_hash, role, full_name, email)
@@ -111,6 +230,11 @@ def setup_database():
         
         conn.commit()
         print("[OK] Enhanced tables created successfully")
+        
+        # Versioned changes on top of the base schema: doctor_id on older
+        # consultations tables (migration 4), patient indexes (7) and the rest
+        version = apply_migrations(conn)
+        print(f"[OK] Schema at version {version}")
         print("[OK] Default users created:")
         print("   - Admin: admin/admin123")
         print("   - Doctor: doctor/doctor123")
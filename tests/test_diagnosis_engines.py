@@ -0,0 +1,59 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import enhanced_api as api
+
+NO_TREATMENTS = {'medicines': {}, 'precautions': {}}
+
+class CatalogCursor:
+    """Serves the disease/disease_symptom join SymptomIndex.load reads"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return list(self.rows)
+
+def random_catalog(rng, disease_count, vocabulary):
+    """Join rows for a random catalog; small vocabularies force ties and duplicate links"""
+    rows = []
+    for disease_id in rng.sample(range(1, disease_count * 10), disease_count):
+        symptoms = [rng.choice(vocabulary) for _ in range(rng.randint(1, 6))]
+        rows.extend((disease_id, f'Disease {disease_id}', '', symptom) for symptom in symptoms)
+    rng.shuffle(rows)
+    return rows
+
+def ranked(results):
+    return [(r['disease']['id'], r['disease']['matched_symptoms'], r['match_percentage'],
+             r['patient_match_percentage'], r['weighted_score']) for r in results]
+
+@unittest.skipIf(api.np is None, 'NumPy is not installed')
+class DiagnosisEngineTest(unittest.TestCase):
+    """The matrix engine must rank exactly like the inverted-index engine"""
+
+    def test_engines_rank_identically(self):
+        rng = random.Random(2024)
+        for _ in range(200):
+            vocabulary = [f'symptom_{n}' for n in range(rng.randint(3, 40))]
+            snapshot = api.SymptomIndex().load(CatalogCursor(random_catalog(rng, rng.randint(1, 60), vocabulary)))
+            index_snapshot = dict(snapshot, matrix=None)
+            matrix_snapshot = dict(snapshot, matrix=api.build_symptom_matrix(snapshot['diseases']))
+
+            for _ in range(10):
+                symptoms = [rng.choice(vocabulary + ['unknown']) for _ in range(rng.randint(1, 6))]
+                key = list(api.canonical_symptoms(symptoms))
+                self.assertEqual(
+                    ranked(api.build_diagnosis_results(index_snapshot, NO_TREATMENTS, key)),
+                    ranked(api.build_diagnosis_results(matrix_snapshot, NO_TREATMENTS, key)),
+                    msg=f'symptoms={key}'
+                )
+
+if __name__ == '__main__':
+    unittest.main()